@@ -0,0 +1,299 @@
+"""Benchmark the formatting of exceptions.
+
+Each scenario raises an exception from generated code (deep stacks, many or
+big locals, long lines, REPL and `python -c' sources) and measures how long
+`ExceptionFormatter.format_exception()`, the excepthook or a logging call
+takes to render it, colored and not. Latency percentiles are reported, as
+well as the peak memory allocated while formatting (Python 3.4+).
+
+    python benchmarks/bench_format.py [--runs N] [--filter TEXT] [--cold] [--json PATH]
+    python benchmarks/bench_format.py --compare BASE.json NEW.json [--threshold 0.1]
+
+With `--compare', the scenarios whose median latency or peak memory grew by
+more than the threshold are flagged, and the exit status is 1 if any was.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import linecache
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import better_exceptions  # noqa: E402
+from better_exceptions import formatter, repl  # noqa: E402
+from better_exceptions.formatter import ExceptionFormatter  # noqa: E402
+
+
+# name, target, source parameters
+SCENARIOS = [
+    ('depth-10', 'format', dict(depth=10)),
+    ('depth-100', 'format', dict(depth=100)),
+    ('depth-1000', 'format', dict(depth=1000)),
+    ('locals-3x10', 'format', dict(nlocals=3, size=10)),
+    ('locals-50x10', 'format', dict(nlocals=50, size=10)),
+    ('locals-50x100000', 'format', dict(nlocals=50, size=100000)),
+    ('line-1000', 'format', dict(line_terms=50)),
+    ('line-10000', 'format', dict(line_terms=500)),
+    ('repl', 'format', dict(depth=10, origin='repl')),
+    ('string', 'format', dict(depth=10, origin='string')),
+    ('excepthook', 'excepthook', dict(depth=10)),
+    ('logging', 'logging', dict(depth=10)),
+]
+
+
+def generate_source(depth=0, nlocals=3, size=10, line_terms=None):
+    lines = [
+        'def recurse(n):',
+        '    if n:',
+        '        return recurse(n - 1)',
+        '    fail()',
+        '',
+        'def fail():',
+    ]
+    lines.extend('    v{} = list(range({}))'.format(i, size) for i in range(nlocals))
+
+    if line_terms:
+        terms = ' + '.join('len(v{}) * {}'.format(i % nlocals, i) for i in range(line_terms))
+        lines.append('    total = {} + undefined'.format(terms))
+    else:
+        # the values are inspected, but kept out of the message of the exception
+        lines.append('    raise ValueError(len([{}]))'.format(', '.join('v{}'.format(i) for i in range(nlocals))))
+
+    lines.append('')
+    return '\n'.join(lines)
+
+
+class Scenario(object):
+
+    def __init__(self, name, target, directory, depth=0, origin='file', **params):
+        self.name = name
+        self.target = target
+        self.depth = depth
+        source = generate_source(depth=depth, **params)
+
+        if origin == 'file':
+            filename = os.path.join(directory, name.replace('-', '_') + '.py')
+            with open(filename, 'w') as f:
+                f.write(source)
+        elif origin == 'repl':
+            console = repl.BetterExceptionsConsole()
+            filename = repl.REPL_ID_PREFIX + name
+            repl.repl = console
+        else:
+            # the `python -c' source is read from the command line once and
+            # memoized, pretend it was this source
+            filename = '<string>'
+            formatter._string_source_lines = source.split('\n')
+
+        code = compile(source, filename, 'exec')
+        if origin == 'repl':
+            console.entries.add(filename, code, '<stdin>', source)
+
+        self.namespace = {}
+        exec(code, self.namespace)
+
+    def raise_exception(self):
+        try:
+            self.namespace['recurse'](self.depth)
+        except Exception:
+            return sys.exc_info()
+
+    def make_call(self, colored, cold):
+        exc_info = self.raise_exception()
+        options = dict(colored=colored, repeat_threshold=None)
+
+        if self.target == 'format':
+            if cold:
+                def call():
+                    linecache.clearcache()
+                    return ExceptionFormatter(**options).format_exception(*exc_info)
+            else:
+                shared = ExceptionFormatter(**options)
+                call = lambda: shared.format_exception(*exc_info)
+        else:
+            better_exceptions.configure(supports_color=colored, repeat_threshold=None)
+
+            # a new exception for each call, the formatted tracebacks are memoized per exception
+            if self.target == 'excepthook':
+                call = lambda: better_exceptions.excepthook(*self.raise_exception())
+            else:
+                logger = logging.getLogger('bench_format')
+                call = lambda: logger.error('failed', exc_info=self.raise_exception())
+
+        return call
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def measure_memory(call):
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(call, runs, warmup):
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    for _ in range(runs):
+        start = timeit.default_timer()
+        call()
+        timings.append(timeit.default_timer() - start)
+
+    return {
+        'runs': runs,
+        'min': min(timings),
+        'mean': sum(timings) / len(timings),
+        'p50': percentile(timings, 0.50),
+        'p90': percentile(timings, 0.90),
+        'p99': percentile(timings, 0.99),
+        'max': max(timings),
+        'peak_memory': measure_memory(call),
+    }
+
+
+def run(args):
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 5000))
+
+    devnull = open(os.devnull, 'w')
+    better_exceptions.STREAM = devnull
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter())
+    # what `better_exceptions.patch_logging()' does to the handlers writing to stderr
+    handler.formatter.formatException = lambda exc_info: better_exceptions.format_exception(*exc_info)
+    logging.getLogger('bench_format').addHandler(handler)
+    logging.getLogger('bench_format').propagate = False
+
+    colors = {'on': [True], 'off': [False], 'both': [False, True]}[args.color]
+
+    directory = tempfile.mkdtemp(prefix='bench_format_')
+    results = {}
+    try:
+        for name, target, params in SCENARIOS:
+            if args.filter and args.filter not in name:
+                continue
+            if args.cold and target != 'format':
+                # only a formatter of our own can be thrown away on each run
+                continue
+
+            scenario = Scenario(name, target, directory, **params)
+            for colored in colors:
+                key = '{}/{}'.format(name, 'color' if colored else 'plain')
+                call = scenario.make_call(colored, args.cold)
+                results[key] = measure(call, args.runs, 0 if args.cold else args.warmup)
+                print_result(key, results[key])
+    finally:
+        shutil.rmtree(directory)
+        devnull.close()
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cold': args.cold,
+        'results': results,
+    }
+
+
+def format_memory(size):
+    return '-' if size is None else '{:.1f}'.format(size / 1024.0)
+
+
+def print_header():
+    print('{:<28} {:>10} {:>10} {:>10} {:>10} {:>12}'.format(
+        'scenario', 'p50 [ms]', 'p90 [ms]', 'p99 [ms]', 'max [ms]', 'peak [KiB]'))
+
+
+def print_result(key, result):
+    print('{:<28} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>12}'.format(
+        key, result['p50'] * 1000, result['p90'] * 1000, result['p99'] * 1000, result['max'] * 1000,
+        format_memory(result['peak_memory'])))
+
+
+def compare(base_path, new_path, threshold):
+    with open(base_path) as f:
+        base = json.load(f)['results']
+    with open(new_path) as f:
+        new = json.load(f)['results']
+
+    print('{:<28} {:>10} {:>10} {:>8} {:>12} {:>12} {:>8}'.format(
+        'scenario', 'base p50', 'new p50', 'ratio', 'base peak', 'new peak', ''))
+
+    regressions = 0
+    for key in sorted(set(base) & set(new)):
+        before, after = base[key], new[key]
+        ratio = after['p50'] / before['p50'] if before['p50'] else float('inf')
+        flagged = ratio > 1 + threshold
+
+        if before['peak_memory'] and after['peak_memory'] is not None:
+            flagged = flagged or after['peak_memory'] > before['peak_memory'] * (1 + threshold)
+
+        regressions += flagged
+        print('{:<28} {:>10.3f} {:>10.3f} {:>8.2f} {:>12} {:>12} {:>8}'.format(
+            key, before['p50'] * 1000, after['p50'] * 1000, ratio,
+            format_memory(before['peak_memory']), format_memory(after['peak_memory']),
+            'SLOWER' if flagged else ''))
+
+    for key in sorted(set(base) ^ set(new)):
+        print('{:<28} only in {}'.format(key, 'base' if key in base else 'new'))
+
+    print('\n{} regression(s) above {:.0%}'.format(regressions, threshold))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--filter', help='only run the scenarios whose name contains this text')
+    parser.add_argument('--color', choices=('on', 'off', 'both'), default='both')
+    parser.add_argument('--cold', action='store_true',
+                        help='use a new formatter and empty caches on each run (formatter scenarios only)')
+    parser.add_argument('--json', metavar='PATH', help='save the results to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two saved results')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative increase flagged as a regression by --compare (default: 0.1)')
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+
+    print_header()
+    report = run(args)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
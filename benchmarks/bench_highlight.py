@@ -0,0 +1,103 @@
+"""Compare the tokenize highlighter with the former AST-walking colorizer.
+
+The former colorizer is reproduced here: it walked the whole tree of the
+line, sorted the nodes by column and ran a backtracking regex to find the
+comment. Each implementation colors the same lines, from a short call to a
+very long expression.
+
+    python benchmarks/bench_highlight.py [--repeat N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import ast
+import inspect
+import keyword
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from better_exceptions.formatter import THEME  # noqa: E402
+from better_exceptions.highlight import BUILTINS, Highlighter  # noqa: E402
+
+
+COMMENT_REGXP = re.compile(r'((?:(?:"(?:[^\\"]|(\\\\)*\\")*")|(?:\'(?:[^\\"]|(\\\\)*\\\')*\')|[^#])*)(#.*)$')
+
+KEYWORD_NODES = [getattr(ast, cls) for cls in dir(ast)
+                 if keyword.iskeyword(cls.lower()) and inspect.isclass(getattr(ast, cls))
+                 and issubclass(getattr(ast, cls), ast.AST)]
+
+# removed in Python 3.12
+STR_NODE = getattr(ast, 'Str', None)
+NUM_NODE = getattr(ast, 'Num', None)
+
+
+def legacy_colorize(source, theme=THEME):
+    tree = ast.parse(source, mode='exec')
+    displayed_nodes = []
+
+    for node in ast.walk(tree):
+        if not hasattr(node, 'col_offset'):
+            continue
+        nodecls = node.__class__
+        if nodecls in KEYWORD_NODES:
+            displayed_nodes.append((node, nodecls.__name__.lower(), 'keyword'))
+        if nodecls == ast.Name and node.id in BUILTINS:
+            displayed_nodes.append((node, node.id, 'builtin'))
+        if STR_NODE is not None and nodecls == STR_NODE:
+            displayed_nodes.append((node, "'{}'".format(node.s), 'literal'))
+        if NUM_NODE is not None and nodecls == NUM_NODE:
+            displayed_nodes.append((node, str(node.n), 'literal'))
+
+    displayed_nodes.sort(key=lambda elem: elem[0].col_offset)
+
+    chunks = []
+    offset = 0
+    for node, s, style in displayed_nodes:
+        chunks.append(source[offset:node.col_offset])
+        chunks.append(theme[style](s))
+        offset = node.col_offset + len(s)
+    chunks.append(source[offset:])
+
+    source = ''.join(chunks)
+    match = COMMENT_REGXP.match(source)
+    if match:
+        source = '{}{}'.format(match.group(1), theme['comment'](match.group(4)))
+    return source
+
+
+def long_line(terms):
+    return 'result = ' + ' + '.join('len(str(x{0})) * {0}'.format(i) for i in range(terms)) + '  # total'
+
+
+LINES = [
+    ('short', 'foo(bar, "baz", 42)'),
+    ('condition', 'ok = value is not None and len(value) > 10 or not isinstance(value, list)'),
+    ('comment', 'x = compute("a # b", 3)  # not the comment above'),
+    ('long-50', long_line(50)),
+    ('long-500', long_line(500)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    highlighter = Highlighter(THEME)
+
+    print('{:<12} {:>8} {:>14} {:>14} {:>8}'.format('line', 'length', 'legacy [us]', 'tokenize [us]', 'speedup'))
+    for name, line in LINES:
+        number = max(1, 20000 // len(line))
+        legacy = min(timeit.repeat(lambda: legacy_colorize(line), number=number, repeat=args.repeat)) / number
+        current = min(timeit.repeat(lambda: highlighter.highlight(line), number=number, repeat=args.repeat)) / number
+        print('{:<12} {:>8} {:>14.1f} {:>14.1f} {:>7.1f}x'.format(
+            name, len(line), legacy * 1e6, current * 1e6, legacy / current))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Measure the import cost of enabling better_exceptions at interpreter startup.
+
+Compares the eager hook (`better_exceptions.hook()`) with the lazy one
+(`better_exceptions_lazy.hook()`) using `python -X importtime` (Python 3.7+).
+
+    python benchmarks/bench_import.py [--runs N] [--python PATH]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    ('baseline', 'pass'),
+    ('eager', 'import better_exceptions; better_exceptions.hook()'),
+    ('lazy', 'import better_exceptions_lazy; better_exceptions_lazy.hook()'),
+]
+
+
+def run_once(python, statement):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('BETTER_EXCEPTIONS', None)
+
+    start = time.time()
+    proc = subprocess.Popen([python, '-X', 'importtime', '-c', statement],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, err = proc.communicate()
+    wall = time.time() - start
+
+    total = 0
+    modules = 0
+    for line in err.decode('utf-8', 'replace').splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us = line.split(':', 1)[1].split('|')[0]
+        total += int(self_us)
+        modules += 1
+
+    return total, modules, wall
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--python', default=sys.executable)
+    args = parser.parse_args()
+
+    results = {}
+    for name, statement in STATEMENTS:
+        runs = [run_once(args.python, statement) for _ in range(args.runs)]
+        results[name] = (median([r[0] for r in runs]), runs[0][1], median([r[2] for r in runs]))
+
+    base_us, base_modules, base_wall = results['baseline']
+    print('{:<10} {:>14} {:>10} {:>12}'.format('hook', 'imports [us]', 'modules', 'wall [ms]'))
+    for name, _ in STATEMENTS:
+        us, modules, wall = results[name]
+        print('{:<10} {:>14} {:>10} {:>12.1f}'.format(name, us - base_us, modules - base_modules, (wall - base_wall) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Measure what enabling better_exceptions costs an application which creates many loggers.
+
+Each run starts a fresh interpreter which configures a few handlers, then
+creates the loggers (one per module, plus child loggers), and logs one
+exception. The time spent creating the loggers, and in total, is compared
+with and without `better_exceptions.hook()`.
+
+    python benchmarks/bench_loggers.py [--runs N] [--loggers N] [--handlers N] [--python PATH]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import logging, sys, time
+if {hook}:
+    import better_exceptions
+    better_exceptions.hook()
+
+start = time.time()
+for i in range({handlers}):
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.getLogger('app').addHandler(handler)
+loggers = [logging.getLogger('app.module{{}}.child{{}}'.format(i // 10, i % 10)) for i in range({loggers})]
+created = time.time()
+
+try:
+    1 / 0
+except ZeroDivisionError:
+    loggers[-1].exception('failed')
+print(created - start, time.time() - start)
+'''
+
+
+def run_once(python, hook, loggers, handlers):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('BETTER_EXCEPTIONS', None)
+
+    script = SCRIPT.format(hook=hook, loggers=loggers, handlers=handlers)
+    with open(os.devnull, 'w') as devnull:
+        out = subprocess.check_output([python, '-c', script], env=env, stderr=devnull)
+    created, total = out.decode().split()
+    return float(created), float(total)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--loggers', type=int, default=10000)
+    parser.add_argument('--handlers', type=int, default=5)
+    parser.add_argument('--python', default=sys.executable)
+    args = parser.parse_args()
+
+    print('{:<10} {:>14} {:>12}'.format('hook', 'loggers [ms]', 'total [ms]'))
+    for name, hook in (('baseline', False), ('hooked', True)):
+        runs = [run_once(args.python, hook, args.loggers, args.handlers) for _ in range(args.runs)]
+        created = median([r[0] for r in runs])
+        total = median([r[1] for r in runs])
+        print('{:<10} {:>14.1f} {:>12.1f}'.format(name, created * 1000, total * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,15 +13,25 @@ License: Copyright (c) 2017 Josh Junon, licensed under the MIT license
 from __future__ import absolute_import
 from __future__ import print_function
 
-import logging
+import atexit
 import sys
+import traceback
 
-from .formatter import THEME, MAX_LENGTH, PIPE_CHAR, CAP_CHAR, ExceptionFormatter
-from .encoding import to_byte
-from .context import PY3
-from .color import SUPPORTS_COLOR, SHOULD_ENCODE, STREAM
-from .log import BetExcLogger, patch as patch_logging
+from .formatter import THEME, MAX_LENGTH, PIPE_CHAR, CAP_CHAR, CACHE_SIZE, REPR_TIMEOUT, FORMAT_TIMEOUT, \
+                       REPEAT_THRESHOLD, STATS, SOURCE_PROVIDERS, FRAME_POLICIES, FOLD_FRAMES, \
+                       OUTPUT_BUDGET, KEEP_FRAMES, ExceptionFormatter
+from .encoding import get_encoder, to_byte
+from .context import PY3, clock
+from .color import SHOULD_ENCODE, STREAM, supports_color
+from .levels import INNERMOST, UNCOLORED, FULL, LoadMeter, get_environment_level, isatty
+from .log import BetExcLogger, patch as patch_logging, patch_background as patch_logging_background
+from .memo import FormattedMemo
+from .policies import FramePolicy, library_policies
+from .records import ElidedRecord, ExceptionRecord, FoldedRecord, FrameRecord, RepetitionRecord
 from .repl import interact, get_repl
+from .repr import SKIP, register as register_repr
+from .stats import FormatStats
+from .storm import StormGuard
 
 
 __version__ = '0.2.1'
@@ -29,6 +39,74 @@ __version__ = '0.2.1'
 
 THEME = THEME.copy()  # Users customizing the theme should not impact core
 
+# Module-level settings used to build the shared formatter, and the matching
+# ExceptionFormatter keyword arguments.
+FORMATTER_OPTIONS = (
+    ('SUPPORTS_COLOR', 'colored'),
+    ('THEME', 'theme'),
+    ('MAX_LENGTH', 'max_length'),
+    ('PIPE_CHAR', 'pipe_char'),
+    ('CAP_CHAR', 'cap_char'),
+    ('CACHE_SIZE', 'cache_size'),
+    ('REPR_TIMEOUT', 'repr_timeout'),
+    ('FORMAT_TIMEOUT', 'format_timeout'),
+    ('REPEAT_THRESHOLD', 'repeat_threshold'),
+    ('STATS', 'stats'),
+    ('SOURCE_PROVIDERS', 'source_providers'),
+    ('FRAME_POLICIES', 'frame_policies'),
+    ('FOLD_FRAMES', 'fold_frames'),
+    ('OUTPUT_BUDGET', 'output_budget'),
+    ('KEEP_FRAMES', 'keep_frames'),
+)
+
+# Other settings that can be changed with configure()
+SETTINGS = (
+    'STREAMING',
+    'STORM_WINDOW',
+    'STORM_REPORT',
+    'LEVEL',
+    'NON_TTY_LEVEL',
+    'LOAD_THRESHOLD',
+    'LOAD_LEVEL',
+)
+
+# How much is inspected and colorized: INNERMOST (1), UNCOLORED (2) or FULL (3)
+LEVEL = get_environment_level()
+# Level to drop to when the stream is not a terminal (None to keep LEVEL)
+NON_TTY_LEVEL = None
+# Exceptions per second beyond which the level drops to LOAD_LEVEL (None disables)
+LOAD_THRESHOLD = None
+LOAD_LEVEL = INNERMOST
+
+# Write the traceback of uncaught exceptions frame by frame, as they are formatted
+STREAMING = False
+
+# Seconds during which the repetitions of an exception (same type, same
+# frames) are summarized on one line instead of being formatted again
+STORM_WINDOW = None
+# Called with the (title, count) of the exceptions repeated in past windows
+STORM_REPORT = None
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # SUPPORTS_COLOR is only detected once read, unless it is set
+        if name == 'SUPPORTS_COLOR':
+            return supports_color()
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+else:
+    from .color import SUPPORTS_COLOR
+
+_formatter = None
+_formatter_config = None
+_plain_formatter = None
+_plain_formatter_config = None
+_storm_guard = None
+_load = LoadMeter()
+
+# Tracebacks already formatted by the shared formatter, per exception and
+# per configuration (colored or not, ...)
+_formatted = FormattedMemo()
+
 
 def write_stream(data, stream=STREAM):
     if SHOULD_ENCODE:
@@ -42,22 +120,247 @@ def write_stream(data, stream=STREAM):
         stream.write(data)
 
 
+def write_stream_chunks(chunks, stream=STREAM, stats=None):
+    """Encode and write each chunk as soon as it is produced."""
+    unicode_type = str if PY3 else unicode
+
+    if SHOULD_ENCODE:
+        encoder = get_encoder()
+        write = stream.buffer.write if PY3 else stream.write
+        for chunk in chunks:
+            start = clock()
+            write(encoder.encode(chunk) if isinstance(chunk, unicode_type) else chunk)
+            stream.flush()
+            if stats is not None:
+                stats.add('encode', clock() - start)
+        write(encoder.encode(u'', final=True))
+    else:
+        for chunk in chunks:
+            start = clock()
+            stream.write(chunk)
+            stream.flush()
+            if stats is not None:
+                stats.add('encode', clock() - start)
+
+
+def get_level():
+    """Return the level exceptions are currently formatted at, after the drops for the output and the load."""
+    level = LEVEL
+    if NON_TTY_LEVEL is not None and not isatty(STREAM):
+        level = min(level, NON_TTY_LEVEL)
+    if LOAD_THRESHOLD is not None and _load.rate() > LOAD_THRESHOLD:
+        level = min(level, LOAD_LEVEL)
+    return level
+
+
+def _count_load():
+    if LOAD_THRESHOLD is not None:
+        _load.add()
+
+
+def _get_setting(name):
+    try:
+        return globals()[name]
+    except KeyError:
+        # SUPPORTS_COLOR, until it is read or set
+        return supports_color()
+
+
+def _current_config():
+    config = []
+    for name, _ in FORMATTER_OPTIONS:
+        value = _get_setting(name)
+        # snapshot dicts so that in-place changes to the theme are noticed,
+        # as items so that the configuration can key the formatted tracebacks
+        if isinstance(value, dict):
+            value = tuple(sorted(value.items()))
+        elif isinstance(value, list):
+            value = tuple(value)
+        config.append(value)
+    config.append(get_level())
+    return tuple(config)
+
+
+def configure(**options):
+    """Change the global settings, e.g. `configure(max_length=None, supports_color=False)`.
+
+    Setting the module attributes directly (`better_exceptions.MAX_LENGTH = 10`)
+    works as well; the shared formatter is rebuilt only if a setting changed.
+    """
+    names = dict((name.lower(), name) for name, _ in FORMATTER_OPTIONS)
+    names.update((name.lower(), name) for name in SETTINGS)
+    for option, value in options.items():
+        if option not in names:
+            raise TypeError("configure() got an unexpected keyword argument '{}'".format(option))
+        globals()[names[option]] = value
+
+
+def get_formatter():
+    """Return the formatter shared by the excepthook, the logging patch and the REPL."""
+    global _formatter, _formatter_config
+
+    config = _current_config()
+    if _formatter is None or config != _formatter_config:
+        kwargs = dict((kwarg, _get_setting(name)) for name, kwarg in FORMATTER_OPTIONS)
+        kwargs['level'] = config[-1]
+        _formatter = ExceptionFormatter(**kwargs)
+        _formatter_config = config
+
+    return _formatter
+
+
+def get_plain_formatter():
+    """Return a formatter with the shared settings, but which never colorizes anything."""
+    global _plain_formatter, _plain_formatter_config
+
+    formatter = get_formatter()
+    if not formatter._colored:
+        return formatter
+
+    if _plain_formatter is None or _plain_formatter_config != _formatter_config:
+        kwargs = dict((kwarg, _get_setting(name)) for name, kwarg in FORMATTER_OPTIONS)
+        kwargs['colored'] = False
+        kwargs['level'] = _formatter_config[-1]
+        _plain_formatter = ExceptionFormatter(**kwargs)
+        _plain_formatter_config = _formatter_config
+
+    return _plain_formatter
+
+
+def get_storm_guard():
+    """Return the guard against storms of identical exceptions, or None if disabled."""
+    global _storm_guard
+
+    guard = _storm_guard
+    if STORM_WINDOW is None:
+        _storm_guard = None
+    elif guard is None or (guard.window, guard.report) != (STORM_WINDOW, STORM_REPORT):
+        _storm_guard = StormGuard(STORM_WINDOW, STORM_REPORT)
+
+    # the counters of a replaced guard are not lost
+    if guard is not None and guard is not _storm_guard:
+        guard.report_pending()
+
+    return _storm_guard
+
+
+def _report_storms():
+    if _storm_guard is not None:
+        _storm_guard.report_pending()
+
+
+# the last storms before a quiet period would never be flushed otherwise
+atexit.register(_report_storms)
+
+
+def check_storm(exc, value, tb):
+    guard = get_storm_guard()
+    if guard is None:
+        return None
+    return guard.check(exc, value, tb)
+
+
 def format_exception(exc, value, tb):
-    # Rebuild each time to take into account any changes made by the user to the global parameters
-    formatter = ExceptionFormatter(colored=SUPPORTS_COLOR, theme=THEME, max_length=MAX_LENGTH,
-                                   pipe_char=PIPE_CHAR, cap_char=CAP_CHAR)
-    return formatter.format_exception(exc, value, tb)
+    """Format an exception with the shared formatter, once per exception instance."""
+    formatter = get_formatter()
+    variant = _formatter_config
+
+    formatted = _formatted.get(value, tb, variant)
+    if formatted is None:
+        formatted = check_storm(exc, value, tb)
+        if formatted is None:
+            _count_load()
+            formatted = formatter.format_exception(exc, value, tb)
+        _formatted.set(value, tb, variant, formatted)
+
+    return formatted
+
+
+def snapshot_exception(exc, value, tb):
+    """Capture an exception to format it later with `format_snapshot()`, without keeping its frames."""
+    formatter = get_formatter()
+
+    # the same exception may be captured for several handlers, it is only counted by the storm guard once
+    variant = ('snapshot', _formatter_config)
+    snapshot = _formatted.get(value, tb, variant)
+    if snapshot is None:
+        snapshot = _formatted.get(value, tb, _formatter_config)
+    if snapshot is None:
+        snapshot = check_storm(exc, value, tb)
+        if snapshot is None:
+            _count_load()
+            snapshot = formatter.snapshot_exception(exc, value, tb)
+        _formatted.set(value, tb, variant, snapshot)
+
+    return snapshot
+
+
+def format_snapshot(snapshot):
+    if isinstance(snapshot, ExceptionRecord):
+        return get_formatter().format_snapshot(snapshot)
+    # already formatted, or summarized
+    return snapshot
+
+
+def capture_exception(exc=None, value=None, tb=None, clear_frames=False):
+    """Turn an exception (the one being handled by default) into an `ExceptionRecord`.
+
+    The record holds what is displayed, as strings: the traceback can be
+    released right away, and the record formatted later with
+    `format_record()`. With `clear_frames`, the local variables of the frames
+    are cleared as well (Python 3.4+), for the tracebacks which are still
+    referenced elsewhere.
+    """
+    if exc is None:
+        exc, value, tb = sys.exc_info()
+
+    record = get_formatter().snapshot_exception(exc, value, tb)
+
+    if clear_frames and hasattr(traceback, 'clear_frames'):
+        traceback.clear_frames(tb)
+
+    return record
+
+
+def format_record(record):
+    return get_formatter().format_snapshot(record)
+
+
+def structure_exception(exc=None, value=None, tb=None):
+    """Return an exception (the one being handled by default) as plain data, ready to be serialized.
+
+    See `better_exceptions.structured` to encode it as JSON.
+    """
+    if exc is None:
+        exc, value, tb = sys.exc_info()
+
+    return get_plain_formatter().structure_exception(exc, value, tb)
 
 
 def excepthook(exc, value, tb):
-    formatted = format_exception(exc, value, tb)
-    write_stream(formatted, STREAM)
+    formatter = get_formatter()
+
+    if not STREAMING:
+        formatted = format_exception(exc, value, tb)
+        formatter.timed('encode', write_stream, formatted, STREAM)
+        return
+
+    variant = _formatter_config
+    formatted = _formatted.get(value, tb, variant)
+    if formatted is None:
+        formatted = check_storm(exc, value, tb)
+
+    if formatted is not None:
+        write_stream(formatted, STREAM)
+    else:
+        # not memoized, the whole traceback is never held in memory
+        _count_load()
+        write_stream_chunks(formatter.iter_exception(exc, value, tb), STREAM, formatter.stats)
 
 
 def hook():
     sys.excepthook = excepthook
 
-    logging.setLoggerClass(BetExcLogger)
     patch_logging()
 
     if hasattr(sys, 'ps1'):
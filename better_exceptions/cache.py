@@ -0,0 +1,64 @@
+"""A small least-recently-used cache with hit/miss statistics.
+
+Used by the formatter to avoid re-parsing and re-colorizing the same
+source lines over and over again when the same exceptions are raised
+repeatedly.
+"""
+
+from __future__ import absolute_import
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # re-insert so that the entry becomes the most recently used one
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+
+        self._data.pop(key, None)
+        self._data[key] = value
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
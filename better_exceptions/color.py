@@ -2,6 +2,14 @@
 
 Also specifies the stream to write to. On Windows, this is a wrapped
 stream.
+
+Looking up the terminfo database takes up to 16 `open()` calls, so the
+colors are only detected on first use (`supports_color()`, or the first
+read of `SUPPORTS_COLOR` from Python 3.7, on import before), and cached per
+terminal and terminfo directories. The result can also be shared with
+other processes: through the environment of the child processes
+(`share_detection()`), or through a file whose path is set in the
+`BETTER_EXCEPTIONS_COLORS_FILE` environment variable.
 """
 
 from __future__ import absolute_import
@@ -17,16 +25,25 @@ from .encoding import to_byte as _byte
 
 STREAM = sys.stderr
 SHOULD_ENCODE = True
-SUPPORTS_COLOR = False
+# None until detected, see supports_color()
+_supports_color = None
 
+# Environment variables sharing the detected number of colors
+COLORS_VARIABLE = 'BETTER_EXCEPTIONS_COLORS'
+COLORS_FILE_VARIABLE = 'BETTER_EXCEPTIONS_COLORS_FILE'
 
-def get_terminfo_file():
-    term = os.getenv('TERM', None)
+# Terminfo formats, numbers are stored on 16 bits or, in the extended one, on 32 bits
+TERMINFO_MAGIC = {
+    0x11A: '<h',
+    0x21E: '<i',
+}
+MAX_COLORS_INDEX = 13
 
-    if term is None:
-        return None
+_max_colors = {}
 
-    terminfo_dirs = [
+
+def get_terminfo_dirs():
+    return [
             os.path.expanduser('~/.terminfo'),
             '/etc/terminfo',
             '/lib/terminfo',
@@ -37,23 +54,158 @@ def get_terminfo_file():
             '/usr/local/share/terminfo'
             ]
 
+
+def get_terminfo_file(term=None, terminfo_dirs=None):
+    if term is None:
+        term = os.getenv('TERM', None)
+
+    if not term:
+        return None
+
+    if terminfo_dirs is None:
+        terminfo_dirs = get_terminfo_dirs()
+
     subdirs = [
             ('%0.2X' % ord(term[0])),
             term[0]
             ]
 
-    f = None
     for terminfo_dir in terminfo_dirs:
         for subdir in subdirs:
             terminfo_path = os.path.join(terminfo_dir, subdir, term)
             try:
-                f = open(terminfo_path, 'rb')
-                break
+                return open(terminfo_path, 'rb')
             except IOError as e:
                 if e.errno != errno.ENOENT:
                     raise
 
-    return f
+    return None
+
+
+def read_max_colors(f):
+    """Return the number of colors of a compiled terminfo file, or 0 if it is unknown."""
+    header = f.read(12)
+    if len(header) < 12:
+        return 0
+
+    magic_number, names_size, bools_count, numbers_count, _, _ = struct.unpack('<6h', header)
+    number_format = TERMINFO_MAGIC.get(magic_number)
+    if number_format is None or numbers_count <= MAX_COLORS_INDEX:
+        return 0
+
+    offset = 12 + names_size + bools_count
+    offset += offset % 2  # align to short boundary
+    offset += MAX_COLORS_INDEX * struct.calcsize(number_format)
+
+    f.seek(offset)
+    data = f.read(struct.calcsize(number_format))
+    if len(data) < struct.calcsize(number_format):
+        return 0
+
+    # absent (-1) or cancelled (-2)
+    return max(struct.unpack(number_format, data)[0], 0)
+
+
+def probe_max_colors(term, terminfo_dirs):
+    f = get_terminfo_file(term, terminfo_dirs)
+    if f is None:
+        return 0
+
+    with f:
+        return read_max_colors(f)
+
+
+def format_entry(key, colors):
+    term, terminfo_dirs = key
+    return '{} {} {}'.format(colors, term, os.pathsep.join(terminfo_dirs))
+
+
+def parse_entries(text):
+    entries = {}
+    for line in text.splitlines():
+        try:
+            colors, term, terminfo_dirs = line.split(' ', 2)
+            entries[(term, tuple(terminfo_dirs.split(os.pathsep)))] = int(colors)
+        except ValueError:
+            continue
+    return entries
+
+
+def load_shared_colors(key):
+    colors = parse_entries(os.getenv(COLORS_VARIABLE, '')).get(key)
+    if colors is not None:
+        return colors
+
+    path = os.getenv(COLORS_FILE_VARIABLE)
+    if path:
+        try:
+            with open(path) as f:
+                return parse_entries(f.read()).get(key)
+        except (IOError, OSError):
+            pass
+
+    return None
+
+
+def save_shared_colors(key, colors):
+    path = os.getenv(COLORS_FILE_VARIABLE)
+    if not path:
+        return
+
+    try:
+        with open(path, 'a') as f:
+            f.write(format_entry(key, colors) + '\n')
+    except (IOError, OSError):
+        pass
+
+
+def get_max_colors():
+    """Return the number of colors of the terminal according to its terminfo, 0 if it is unknown."""
+    term = os.getenv('TERM', None)
+    if not term:
+        return 0
+
+    key = (term, tuple(get_terminfo_dirs()))
+    colors = _max_colors.get(key)
+    if colors is None:
+        colors = load_shared_colors(key)
+        if colors is None:
+            colors = probe_max_colors(*key)
+            save_shared_colors(key, colors)
+        _max_colors[key] = colors
+
+    return colors
+
+
+def share_detection():
+    """Export the detected colors to the environment, for the child processes started afterwards."""
+    get_max_colors()
+
+    entries = parse_entries(os.getenv(COLORS_VARIABLE, ''))
+    entries.update(_max_colors)
+    os.environ[COLORS_VARIABLE] = '\n'.join(format_entry(key, colors) for key, colors in sorted(entries.items()))
+
+
+def supports_color():
+    """Detect, on first use, whether the standard error is a terminal that supports colors."""
+    global _supports_color
+
+    if _supports_color is None:
+        _supports_color = _detect_color()
+    return _supports_color
+
+
+def _detect_color():
+    if os.getenv('FORCE_COLOR', None) == '1':
+        return True
+
+    try:
+        # May raises an error on some exotic environment like GAE, see #28
+        is_tty = os.isatty(2)
+    except OSError:
+        is_tty = False
+
+    return is_tty and get_max_colors() >= 8
 
 
 class ProxyBufferStreamWrapper(object):
@@ -85,34 +237,13 @@ if os.name == 'nt':
         SHOULD_ENCODE = False
 
     STREAM = AnsiToWin32(stream).stream
-    SUPPORTS_COLOR = True
+    _supports_color = True
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # SUPPORTS_COLOR is only detected once read
+        if name == 'SUPPORTS_COLOR':
+            return supports_color()
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 else:
-    if os.getenv('FORCE_COLOR', None) == '1':
-        SUPPORTS_COLOR = True
-    else:
-        try:
-            # May raises an error on some exotic environment like GAE, see #28
-            is_tty = os.isatty(2)
-        except OSError:
-            is_tty = False
-
-        if is_tty:
-            f = get_terminfo_file()
-            if f is not None:
-                with f:
-                    # f is a valid terminfo; seek and read!
-                    magic_number = struct.unpack('<h', f.read(2))[0]
-
-                    if magic_number == 0x11A:
-                        # the opened terminfo file is valid.
-                        offset = 2 + 10  # magic number + size section (the next thing we read from)
-                        offset += struct.unpack('<h', f.read(2))[0]  # skip over names section
-                        offset += struct.unpack('<h', f.read(2))[0]  # skip over bool section
-                        offset += offset % 2  # align to short boundary
-                        offset += 13 * 2  # maxColors is the 13th numeric value
-
-                        f.seek(offset)
-                        max_colors = struct.unpack('<h', f.read(2))[0]
-
-                        if max_colors >= 8:
-                            SUPPORTS_COLOR = True
+    SUPPORTS_COLOR = supports_color()
@@ -1,3 +1,6 @@
 import sys
+import time
 
 PY3 = sys.version_info[0] >= 3
+
+clock = getattr(time, 'perf_counter', time.time)
@@ -0,0 +1,84 @@
+"""Time limits for the code run while formatting an exception.
+
+`repr()` of arbitrary objects can take a long time (lazy database queries,
+proxies to remote objects, ...). `call_with_timeout()` interrupts such a
+call once its time budget is spent. The check is done by a trace function
+installed on the calling thread, so it works from any thread (e.g. while
+logging from a worker) but only Python code can be interrupted.
+
+A trace function which raises is removed by the interpreter: if the code
+interrupted catches `TimeoutExpired` (e.g. with `except Exception`), a
+profile function installs the check again, on the frames of the call as
+well, and the call times out anyway once it returns. This is not possible
+while a profiler implemented in C (e.g. cProfile) is enabled.
+
+A tracer already installed (a debugger, coverage, ...) keeps receiving the
+events of the call: the check is chained to it, and it is restored after,
+as well as a profile function.
+"""
+
+from __future__ import absolute_import
+
+import sys
+
+from .context import clock
+
+
+class TimeoutExpired(Exception):
+    pass
+
+
+def call_with_timeout(timeout, func, *args):
+    deadline = clock() + timeout
+    previous = sys.gettrace()
+    previous_profile = sys.getprofile()
+    caller = sys._getframe()
+    expired = []
+
+    def chain(local):
+        """Return a local trace function checking the deadline, then calling `local`."""
+        def tracer(frame, event, arg):
+            check(event)
+            if local is None:
+                return tracer
+            following = local(frame, event, arg)
+            return tracer if following is local else chain(following)
+        return tracer
+
+    def check(event):
+        # raising on an exception would only replace it, where it may be caught
+        if event != 'exception' and clock() > deadline:
+            expired.append(True)
+            raise TimeoutExpired()
+
+    def tracer(frame, event, arg):
+        check(event)
+        return chain(None if previous is None else previous(frame, event, arg))
+
+    def rearm(frame, event, arg):
+        if expired and sys.gettrace() is None:
+            # the timeout was raised, and caught: check the deadline again in every frame of the call
+            sys.settrace(tracer)
+            current = frame
+            while current is not None and current is not caller:
+                current.f_trace = chain(None)
+                current = current.f_back
+        if previous_profile is not None:
+            previous_profile(frame, event, arg)
+
+    # a profiler implemented in C (e.g. cProfile) could not be restored, it is left alone
+    rearming = previous_profile is None or callable(previous_profile)
+    if rearming:
+        sys.setprofile(rearm)
+    sys.settrace(tracer)
+    try:
+        result = func(*args)
+    finally:
+        if rearming:
+            sys.setprofile(previous_profile)
+        sys.settrace(previous)
+
+    if expired:
+        # whatever the call did once interrupted
+        raise TimeoutExpired()
+    return result
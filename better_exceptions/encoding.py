@@ -24,6 +24,11 @@ def to_byte(val):
     return val
 
 
+def get_encoder():
+    """Return an incremental encoder for the output, escaping what cannot be encoded."""
+    return codecs.getincrementalencoder(ENCODING)(errors='backslashreplace')
+
+
 def to_unicode(val):
     if isinstance(val, bytes):
         try:
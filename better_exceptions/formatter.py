@@ -1,18 +1,24 @@
 from __future__ import absolute_import
 
 import ast
-import inspect
-import keyword
-import linecache
 import os
 import re
 import sys
 import traceback
 
-from .color import STREAM, SUPPORTS_COLOR
-from .context import PY3
+from .cache import LRUCache
+from .color import STREAM, supports_color
+from .context import PY3, clock
+from .deadline import TimeoutExpired, call_with_timeout
 from .encoding import ENCODING, to_byte, to_unicode
+from .highlight import Highlighter
+from .levels import FULL, INNERMOST, check_level
+from .policies import INSPECT, PLAIN, FramePolicies, library_policies
 from .repl import get_repl
+from .records import ElidedRecord, ExceptionRecord, FoldedRecord, FrameRecord, RepetitionRecord
+from .repr import BoundedRepr
+from .sources import default_providers
+from .statements import StatementIndex
 
 
 PIPE_CHAR = u'\u2502'
@@ -33,105 +39,173 @@ THEME = {
 }
 
 MAX_LENGTH = 128
-
-
-def isast(v):
-    return inspect.isclass(v) and issubclass(v, ast.AST)
+CACHE_SIZE = 256
+REPR_TIMEOUT = None  # seconds allowed for the repr of a single value
+FORMAT_TIMEOUT = None  # seconds allowed for the values of a whole traceback
+REPEAT_THRESHOLD = 3  # collapse frames repeated at least this many more times (None disables)
+MAX_REPEATED_PERIOD = 16  # longest cycle of frames detected as a repetition
+STATEMENT_INDEX_CACHE_SIZE = 16  # number of files whose statements are kept indexed
+STATS = None  # a FormatStats recording the time spent in each phase of formatting
+SOURCE_PROVIDERS = None  # where to read the source lines from, see better_exceptions.sources
+FRAME_POLICIES = None  # which frames are inspected, see better_exceptions.policies (None: not the libraries)
+FOLD_FRAMES = None  # fold runs of at least this many consecutive plain frames (None disables)
+LEVEL = FULL  # how much is inspected and colorized, see better_exceptions.levels
+OUTPUT_BUDGET = None  # bytes the frames of a traceback should fit in, the middle ones are elided past it (None disables)
+KEEP_FRAMES = 5  # frames kept at each end of a traceback whose middle is elided
+ESTIMATED_SOURCE_LENGTH = 80  # bytes assumed for a source line, which is not read to estimate the output
+ESTIMATED_VALUES = 4  # values assumed below an inspected frame, each as long as max_length
+VALUE_OVERHEAD = 16  # bytes taken by the line of a value besides the value and its column
+
+TIMEOUT_MARKER = '<repr timed out>'
+SKIPPED_MARKER = '[values of the remaining frames skipped: formatting deadline exceeded]'
+TRUNCATED = u'...'
+HEADER = u'Traceback (most recent call last):\n'
+
+# Lines of the `python -c' source, read once per process
+_string_source_lines = None
+
+
+def get_size(text):
+    """Return the bytes a piece of output takes once encoded."""
+    return len(to_byte(text))
+
+
+def truncate(text, size):
+    """Cut a piece of output so that it takes `size` bytes at most once encoded, marker included."""
+    if get_size(text) <= size:
+        return text
+
+    size -= get_size(TRUNCATED)
+    text = to_unicode(text)[:max(size, 0)]
+    # a character takes one byte at least
+    excess = get_size(text) - size
+    while text and excess > 0:
+        text = text[:-excess]
+        excess = get_size(text) - size
+
+    return text + TRUNCATED
 
 
 class ExceptionFormatter(object):
 
-    COMMENT_REGXP = re.compile(r'((?:(?:"(?:[^\\"]|(\\\\)*\\")*")|(?:\'(?:[^\\"]|(\\\\)*\\\')*\')|[^#])*)(#.*)$')
     CMDLINE_REGXP = re.compile(r'(?:[^\t ]*([\'"])(?:\\.|.)*(?:\1))[^\t ]*|([^\t ]+)')
 
-    AST_ELEMENTS = {
-        'builtins': __builtins__.keys() if type(__builtins__) is dict else dir(__builtins__),
-        'keywords': [getattr(ast, cls) for cls in dir(ast) if keyword.iskeyword(cls.lower()) and isast(getattr(ast, cls))],
-    }
-
-    def __init__(self, colored=SUPPORTS_COLOR, theme=THEME, max_length=MAX_LENGTH,
-                       pipe_char=PIPE_CHAR, cap_char=CAP_CHAR):
-        self._colored = colored
+    def __init__(self, colored=None, theme=THEME, max_length=MAX_LENGTH,
+                       pipe_char=PIPE_CHAR, cap_char=CAP_CHAR, cache_size=CACHE_SIZE,
+                       repr_timeout=REPR_TIMEOUT, format_timeout=FORMAT_TIMEOUT,
+                       repeat_threshold=REPEAT_THRESHOLD, stats=STATS, source_providers=SOURCE_PROVIDERS,
+                       frame_policies=FRAME_POLICIES, fold_frames=FOLD_FRAMES, level=LEVEL,
+                       output_budget=OUTPUT_BUDGET, keep_frames=KEEP_FRAMES):
+        self._level = check_level(level)
+        # only the full level colorizes, the colors of the terminal are not even detected otherwise
+        if level < FULL:
+            self._colored = False
+        else:
+            self._colored = supports_color() if colored is None else colored
         self._theme = theme
         self._max_length = max_length
         self._pipe_char = pipe_char
         self._cap_char = cap_char
+        self._cache = LRUCache(cache_size)
+        self._statement_indexes = LRUCache(STATEMENT_INDEX_CACHE_SIZE)
+        self._repr = BoundedRepr(max_length)
+        self._highlighter = Highlighter(theme)
+        self._repr_timeout = repr_timeout
+        self._format_timeout = format_timeout
+        self._repeat_threshold = repeat_threshold
+        self.stats = stats
+        self._source_providers = default_providers() if source_providers is None else tuple(source_providers)
+        self._frame_policies = FramePolicies(library_policies() if frame_policies is None else frame_policies)
+        self._fold_frames = fold_frames
+        self._output_budget = output_budget
+        self._keep_frames = keep_frames
+
+    def timed(self, phase, func, *args):
+        """Call `func(*args)`, counting its duration in the given phase if stats are enabled."""
+        if self.stats is None:
+            return func(*args)
+
+        start = clock()
+        try:
+            return func(*args)
+        finally:
+            self.stats.add(phase, clock() - start)
 
-    def colorize_comment(self, source):
-        match = self.COMMENT_REGXP.match(source)
-        if match:
-            source = '{}{}'.format(match.group(1), self._theme['comment'](match.group(4)))
-        return source
-
-    def colorize_tree(self, tree, source):
+    def colorize(self, source):
         if not self._colored:
             # quick fail
             return source
 
-        chunks = []
-
-        offset = 0
-        nodes = [n for n in ast.walk(tree)]
-
-        def append(offset, node, s, theme):
-            begin_col = node.col_offset
-            src_chunk = source[offset:begin_col]
-            chunks.append(src_chunk)
-            chunks.append(self._theme[theme](s))
-            return begin_col + len(s)
-
-        displayed_nodes = []
-
-        for node in nodes:
-            nodecls = node.__class__
-            nodename = nodecls.__name__
-
-            if 'col_offset' not in dir(node):
-                continue
-
-            if nodecls in self.AST_ELEMENTS['keywords']:
-                displayed_nodes.append((node, nodename.lower(), 'keyword'))
-
-            if nodecls == ast.Name and node.id in self.AST_ELEMENTS['builtins']:
-                displayed_nodes.append((node, node.id, 'builtin'))
-
-            if nodecls == ast.Str:
-                displayed_nodes.append((node, "'{}'".format(node.s), 'literal'))
-
-            if nodecls == ast.Num:
-                displayed_nodes.append((node, str(node.n), 'literal'))
-
-        displayed_nodes.sort(key=lambda elem: elem[0].col_offset)
-
-        for dn in displayed_nodes:
-            offset = append(offset, *dn)
-
-        chunks.append(source[offset:])
-        return self.colorize_comment(''.join(chunks))
+        return self._highlighter.highlight(source)
 
     def get_relevant_names(self, source, tree):
         return [node for node in ast.walk(tree) if isinstance(node, ast.Name)]
 
-    def format_value(self, v):
-        v = repr(v)
-        max_length = self._max_length
-        if max_length is not None and len(v) > max_length:
-            v = v[:max_length] + '...'
-        return v
+    def format_value(self, v, limit=None):
+        return self._repr.repr(v, limit)
+
+    def format_value_guarded(self, v, deadline=None, limit=None):
+        timeout = self._repr_timeout
+        if deadline is not None:
+            remaining = deadline - clock()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        if timeout is None:
+            return self.format_value(v, limit)
 
-    def get_relevant_values(self, source, frame, tree):
-        names = self.get_relevant_names(source, tree)
+        try:
+            return call_with_timeout(timeout, self.format_value, v, limit)
+        except TimeoutExpired:
+            return TIMEOUT_MARKER
+
+    def get_relevant_values(self, source, frame, tree, names=None, deadline=None, memo=None, room=None):
+        """Render the values of the names of a line.
+
+        `memo` maps the id of the values already rendered (e.g. in other
+        frames of the same traceback) to the value and its rendering, so that
+        each object is rendered only once. With `room`, the values are cut to
+        fit in that many bytes altogether, each one to its share of it.
+        """
+        if names is None:
+            names = [(node.id, node.col_offset) for node in self.get_relevant_names(source, tree)]
+        if memo is None:
+            memo = {}
         values = []
 
-        for name in names:
-            text = name.id
-            col = name.col_offset
+        for index, (text, col) in enumerate(names):
             if text in frame.f_locals:
                 val = frame.f_locals.get(text, None)
-                values.append((text, col, self.format_value(val)))
             elif text in frame.f_globals:
                 val = frame.f_globals.get(text, None)
-                values.append((text, col, self.format_value(val)))
+            else:
+                continue
+
+            if self._repr.skips(val):
+                continue
+
+            limit = None
+            if room is not None:
+                limit = max(room // (len(names) - index) - col - VALUE_OVERHEAD, 0)
+
+            memoized = memo.get(id(val))
+            if memoized is not None:
+                formatted = memoized[1]
+            elif self.stats is None:
+                formatted = self.format_value_guarded(val, deadline, limit)
+            else:
+                start = clock()
+                formatted = self.format_value_guarded(val, deadline, limit)
+                self.stats.add_value(type(val), clock() - start)
+
+            if memoized is None:
+                # the value is kept as well, so that its id cannot be reused meanwhile
+                memo[id(val)] = (val, formatted)
+
+            if limit is not None:
+                # the repr is limited in characters, the room in bytes
+                formatted = truncate(formatted, limit)
+                room -= get_size(formatted) + col + VALUE_OVERHEAD
+            values.append((text, col, formatted))
 
         values.sort(key=lambda e: e[1])
 
@@ -140,29 +214,64 @@ class ExceptionFormatter(object):
     def split_cmdline(self, cmdline):
         return [m.group(0) for m in self.CMDLINE_REGXP.finditer(cmdline)]
 
-    def get_string_source(self):
-        import os
-        import platform
+    def get_cmdline_args(self):
+        """Return the arguments the interpreter was started with, or None if unknown."""
+        args = getattr(sys, 'orig_argv', None)
+        if args:
+            return list(args)
+
+        try:
+            with open('/proc/self/cmdline', 'rb') as fd:
+                cmdline = fd.read()
+        except (IOError, OSError):
+            return None
+
+        # arguments are NUL-separated (and NUL-terminated), no quoting involved
+        args = cmdline.split(b'\0')
+        if args and not args[-1]:
+            args.pop()
+
+        if PY3:
+            args = [os.fsdecode(arg) for arg in args]
+
+        return args or None
+
+    def get_cmdline_source(self, args):
+        """Extract the code passed through `-c' from the interpreter arguments."""
+        args = iter(args[1:])
+        for arg in args:
+            if arg.startswith('--'):
+                if arg == '--':
+                    return None
+                if arg == '--check-hash-based-pycs':
+                    next(args, None)
+                continue
+
+            if not arg.startswith('-') or arg == '-':
+                # reached the script name (or stdin): no `-c' source
+                return None
 
-        # import pdb; pdb.set_trace()
+            # a cluster of short options, e.g. `-Bc' or `-W ignore'
+            for i in range(1, len(arg)):
+                option = arg[i]
+                rest = arg[i + 1:]
+                if option == 'c':
+                    return rest if rest else next(args, None)
+                if option in ('W', 'X'):
+                    if not rest:
+                        next(args, None)
+                    break
+                if option == 'm':
+                    return None
 
-        cmdline = None
-        if platform.system() == 'Windows':
-            # TODO use winapi to obtain the command line
-            return ''
-        elif platform.system() == 'Linux':
-            # TODO try to use proc
-            pass
+        return None
 
-        if cmdline is None and os.name == 'posix':
-            from subprocess import CalledProcessError, check_output as spawn
+    def get_ps_source(self):
+        from subprocess import CalledProcessError, check_output as spawn
 
-            try:
-                cmdline = spawn(['ps', '-ww', '-p', str(os.getpid()), '-o', 'command='])
-            except CalledProcessError:
-                return ''
-        else:
-            # current system doesn't have a way to get the command line
+        try:
+            cmdline = spawn(['ps', '-ww', '-p', str(os.getpid()), '-o', 'command='])
+        except (CalledProcessError, OSError):
             return ''
 
         cmdline = cmdline.decode('utf-8').strip()
@@ -194,36 +303,198 @@ class ExceptionFormatter(object):
 
         return source
 
-    def get_traceback_information(self, tb):
-        frame_info = inspect.getframeinfo(tb)
-        filename = frame_info.filename
-        lineno = frame_info.lineno
-        function = frame_info.function
+    def get_string_source(self, lineno=None):
+        """Return the source given through `python -c', or only one line of it.
+
+        The command line is read once and memoized for the lifetime of the process.
+        """
+        global _string_source_lines
+
+        if _string_source_lines is None:
+            if os.name == 'nt':
+                # TODO use winapi to obtain the command line
+                source = ''
+            else:
+                args = self.get_cmdline_args()
+                if args is None:
+                    # fall back to `ps', e.g. on systems without /proc
+                    source = self.get_ps_source() if os.name == 'posix' else ''
+                else:
+                    # without `-c', e.g. for code executed as a `<string>' by a script
+                    source = self.get_cmdline_source(args) or ''
+
+            _string_source_lines = source.replace('\r\n', '\n').split('\n')
+
+        if lineno is None:
+            return '\n'.join(_string_source_lines)
+
+        if 0 < lineno <= len(_string_source_lines):
+            return _string_source_lines[lineno - 1]
+
+        return ''
+
+    def read_line(self, filename, lineno, module_globals=None):
+        """Read a line of a file from the first source provider which handles it."""
+        for provider in self._source_providers:
+            line = provider.get_line(filename, lineno, module_globals)
+            if line is not None:
+                return line
+        return ''
+
+    def read_source(self, filename, module_globals=None):
+        for provider in self._source_providers:
+            source = provider.get_source(filename, module_globals)
+            if source is not None:
+                return source
+        return ''
 
+    def checkcache(self, filename):
+        for provider in self._source_providers:
+            provider.checkcache(filename)
+
+    def get_source_line(self, filename, lineno, module_globals=None):
         repl = get_repl()
         if repl is not None and filename in repl.entries:
-            _, filename, source = repl.entries[filename]
-            source = source.replace('\r\n', '\n').split('\n')[lineno - 1]
+            entry = repl.entries[filename]
+            filename, source = entry.filename, entry.line(lineno)
         elif filename == '<string>':
-            source = self.get_string_source()
+            source = self.get_string_source(lineno)
+        else:
+            source = self.read_line(filename, lineno, module_globals)
+
+        return filename, source
+
+    def get_source(self, filename, lineno, module_globals=None):
+        filename, source = self.get_source_line(filename, lineno, module_globals)
+        return filename, source.strip()
+
+    def get_whole_source(self, filename, module_globals=None):
+        repl = get_repl()
+        if repl is not None and filename in repl.entries:
+            return repl.entries[filename].source
+        elif filename == '<string>':
+            return self.get_string_source()
+        else:
+            return self.read_source(filename, module_globals)
+
+    def get_statement_index(self, filename, module_globals=None):
+        """Return the index of the statements of a whole file, built once per version of the file."""
+        key = self.get_file_key(filename, None)
+        if key is None:
+            source = self.timed('source', self.get_whole_source, filename, module_globals)
+            key = (filename, source)
+            index = self._statement_indexes.get(key)
         else:
-            source = linecache.getline(filename, lineno)
+            index = self._statement_indexes.get(key)
+            if index is None:
+                source = self.timed('source', self.get_whole_source, filename, module_globals)
 
-        source = source.strip()
+        if index is None:
+            index = self.timed('parse', StatementIndex, source)
+            self._statement_indexes.set(key, index)
+
+        return index
+
+    def get_statement_information(self, filename, lineno, module_globals=None):
+        """Inspect a line which is only a part of a statement spanning several lines."""
+        display_filename, line = self.timed('source', self.get_source_line, filename, lineno, module_globals)
+        source = line.strip()
+
+        found = self.get_statement_index(filename, module_globals).find(lineno)
+        if not found:
+            return (display_filename, source, None, [], source)
+
+        nodes = [node for _, _, statement_nodes in found for node in statement_nodes if node.lineno == lineno]
+        indent = len(line) - len(line.lstrip())
+
+        names = [(node.id, node.col_offset - indent) for node in nodes if isinstance(node, ast.Name)]
+        color_source = self.timed('colorize', self.colorize, source)
+
+        return (display_filename, source, found[0][2][0], names, color_source)
+
+    def get_file_key(self, filename, lineno):
+        repl = get_repl()
+        if (repl is not None and filename in repl.entries) or filename == '<string>':
+            return None
 
         try:
-            tree = ast.parse(source, mode='exec')
-        except SyntaxError:
+            stat = os.stat(filename)
+        except (OSError, TypeError, ValueError):
+            return None
+
+        return (filename, lineno, stat.st_mtime, stat.st_size)
+
+    def get_source_information(self, filename, lineno, module_globals=None):
+        """Return the parsed and colorized source of a line, using the cache if possible.
+
+        Entries of real files are keyed by their modification time and size so
+        that they are invalidated as soon as the file changes. Other sources
+        (REPL, command line, ...) are keyed by the source line itself.
+        """
+        key = self.get_file_key(filename, lineno)
+
+        if key is None:
+            display_filename, source = self.timed('source', self.get_source, filename, lineno, module_globals)
+            key = (filename, lineno, source)
+            info = self._cache.get(key)
+        else:
+            info = self._cache.get(key)
+            if info is None:
+                # the file may have changed since it was last read
+                self.checkcache(filename)
+                display_filename, source = self.timed('source', self.get_source, filename, lineno, module_globals)
+
+        if info is None:
+            try:
+                tree = self.timed('parse', ast.parse, source, '<unknown>', 'exec')
+            except SyntaxError:
+                info = self.get_statement_information(filename, lineno, module_globals)
+            else:
+                names = [(node.id, node.col_offset) for node in self.get_relevant_names(source, tree)]
+                color_source = self.timed('colorize', self.colorize, source)
+                info = (display_filename, source, tree, names, color_source)
+
+            self._cache.set(key, info)
+
+        return info
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+    def get_traceback_information(self, tb, deadline=None, memo=None, room=None):
+        frame = tb.tb_frame
+        lineno = tb.tb_lineno
+        function = frame.f_code.co_name
+
+        filename, source, tree, names, color_source = self.get_source_information(frame.f_code.co_filename, lineno,
+                                                                                  frame.f_globals)
+
+        if tree is None:
             return filename, lineno, function, source, source, []
 
-        relevant_values = self.get_relevant_values(source, tb.tb_frame, tree)
-        color_source = self.colorize_tree(tree, source)
+        if room is not None:
+            shown = color_source if self._colored else source
+            room -= get_size(self.format_location(filename, lineno, function, shown))
+
+        relevant_values = self.get_relevant_values(source, frame, tree, names, deadline, memo, room)
 
         return filename, lineno, function, source, color_source, relevant_values
 
+    def get_plain_information(self, tb):
+        """Return the information of a frame whose values are not inspected."""
+        lineno = tb.tb_lineno
+        filename, source = self.timed('source', self.get_source, tb.tb_frame.f_code.co_filename, lineno,
+                                      tb.tb_frame.f_globals)
+
+        return filename, lineno, tb.tb_frame.f_code.co_name, source, source, []
+
+    def format_frame(self, record):
+        """Lay out a `FrameRecord`."""
+        color_source = record.color_source if self._colored else record.source
+        relevant_values = record.values
 
-    def format_traceback_frame(self, tb):
-        filename, lineno, function, source, color_source, relevant_values = self.get_traceback_information(tb)
+        if self.stats is not None:
+            start = clock()
 
         lines = [color_source]
         for i in reversed(range(len(relevant_values))):
@@ -242,12 +513,32 @@ class ExceptionFormatter(object):
 
             line += u'{}{} {}'.format((' ' * (col - index)), self._cap_char, val)
             lines.append(self._theme['inspect'](line) if self._colored else line)
+        if record.marker is not None:
+            lines.append(record.marker)
         formatted = u'\n    '.join([to_unicode(x) for x in lines])
 
-        return (filename, lineno, function, formatted), color_source
+        if self.stats is not None:
+            self.stats.add('layout', clock() - start)
 
+        return (record.filename, record.lineno, record.function, formatted), color_source
 
-    def format_traceback(self, tb=None):
+    def format_traceback_frame(self, tb, deadline=None):
+        return self.format_frame(FrameRecord(*self.get_traceback_information(tb, deadline)))
+
+    def format_plain_frame(self, tb, marker=None):
+        return self.format_frame(FrameRecord(*self.get_plain_information(tb), marker=marker))
+
+    def iter_frames(self, tb=None, deadline=None, reserved=0):
+        """Inspect the frames of a traceback one by one.
+
+        Yields a `FrameRecord` for each frame to display, a `RepetitionRecord`
+        for each run of repeated frames which is collapsed, and a
+        `FoldedRecord` for each run of library frames which is folded, and an
+        `ElidedRecord` for the middle frames left out when the output would
+        exceed its budget. The records only hold strings, nothing refers to
+        the frames themselves. `reserved` bytes of the output budget are
+        kept for what is displayed besides the frames, see `fit_frames()`.
+        """
         omit_last = False
         if not tb:
             try:
@@ -257,32 +548,482 @@ class ExceptionFormatter(object):
                 _, _, tb = sys.exc_info()
                 assert tb is not None
 
-        frames = []
-        final_source = ''
+        tracebacks = []
         while tb:
             if omit_last and not tb.tb_next:
                 break
 
-            formatted, colored = self.format_traceback_frame(tb)
-
+            code = tb.tb_frame.f_code
             # special case to ignore runcode() here.
-            if not (os.path.basename(formatted[0]) == 'code.py' and formatted[2] == 'runcode'):
-                final_source = colored
-                frames.append(formatted)
+            if not (os.path.basename(code.co_filename) == 'code.py' and code.co_name == 'runcode'):
+                tracebacks.append(tb)
 
             tb = tb.tb_next
 
-        lines = traceback.format_list(frames)
+        # the last frame is never collapsed, its source is needed for the title
+        repetitions = self.get_repetitions(tracebacks[:-1])
+        collapsed = dict((start + period, (period, repeats)) for start, period, repeats in repetitions)
+
+        policy_actions = [self._frame_policies.get_action(tb.tb_frame) for tb in tracebacks]
+        if self._level == INNERMOST:
+            actions = [PLAIN] * (len(tracebacks) - 1) + [INSPECT] * min(len(tracebacks), 1)
+        else:
+            actions = policy_actions
+        # only the library frames are folded, not the frames made plain by the level
+        folded = self.get_folds(policy_actions, repetitions)
+
+        # the values rendered in this traceback, see get_relevant_values()
+        memo = {}
+
+        if self._output_budget is not None:
+            units = self.get_units(tracebacks, collapsed, folded)
+            for record in self.fit_frames(tracebacks, actions, units, deadline, memo, reserved):
+                yield record
+            return
+
+        skipped = False
+        i = 0
+        while i < len(tracebacks):
+            if i in folded:
+                yield FoldedRecord(folded[i])
+                i += folded[i]
+                continue
+
+            record, skipped = self.get_frame_record(tracebacks[i], actions[i], deadline, memo, skipped)
+            yield record
+
+            i += 1
+            if i in collapsed:
+                period, repeats = collapsed[i]
+                yield RepetitionRecord(period, repeats)
+                i += period * (repeats - 1)
+
+    def get_frame_record(self, tb, action, deadline, memo, skipped, room=None):
+        """Inspect a frame, or only read its source line if it is plain or out of time.
+
+        Returns the `FrameRecord` and whether the deadline is exceeded, from
+        then on the values of the frames are skipped.
+        """
+        if self.stats is not None:
+            start = clock()
+
+        marker = None
+        if skipped or action == PLAIN:
+            information = self.get_plain_information(tb)
+        elif deadline is not None and clock() > deadline:
+            # out of time: fall back to the plain rendering for the remaining frames
+            skipped = True
+            information = self.get_plain_information(tb)
+            marker = SKIPPED_MARKER
+        else:
+            information = self.get_traceback_information(tb, deadline, memo, room)
+
+        if self.stats is not None:
+            self.stats.add_frame(information[0], information[1], information[2], clock() - start)
+
+        return FrameRecord(*information, marker=marker), skipped
+
+    def format_frames(self, records):
+        """Format frame, repetition, folded and elided records, e.g. from `iter_frames()`.
+
+        Yields (formatted, colored_source) pairs; colored_source is None for
+        lines that are not frames.
+        """
+        for record in records:
+            if isinstance(record, RepetitionRecord):
+                yield self.format_repetition(record.period, record.repeats - 1), None
+            elif isinstance(record, FoldedRecord):
+                yield self.format_folded(record.count), None
+            elif isinstance(record, ElidedRecord):
+                yield self.format_elided(record.count), None
+            else:
+                formatted, colored = self.format_frame(record)
+                yield self.format_location(*formatted), colored
+
+    def format_location(self, filename, lineno, function, formatted):
+        # what traceback.format_list() does, which collapses repeated lines since Python 3.6,
+        # and keeps only the first line of the source since Python 3.13
+        location = '  File "{}", line {}, in {}\n'.format(filename, lineno, function)
+        formatted = formatted.strip()
+        if formatted:
+            location += u'    {}\n'.format(formatted)
+        return location
+
+    def iter_traceback(self, tb=None, deadline=None, reserved=0):
+        """Format the frames of a traceback one by one.
+
+        Yields (formatted, colored_source) pairs; colored_source is None for
+        lines that are not frames.
+        """
+        return self.format_frames(self.iter_frames(tb, deadline, reserved))
+
+    def format_traceback(self, tb=None, deadline=None):
+        lines = []
+        final_source = ''
+        for line, colored in self.iter_traceback(tb, deadline):
+            lines.append(line)
+            if colored is not None:
+                final_source = colored
 
         return ''.join(lines), final_source
 
-    def format_exception(self, exc, value, tb):
-        formatted, colored_source = self.format_traceback(tb)
+    def get_repetitions(self, tracebacks):
+        """Find the sequences of frames that are repeated in a row, e.g. by a recursion.
+
+        Returns a list of (start, period, repeats) tuples, for the sequences of
+        `period` frames that occur `repeats` times in a row, starting at
+        index `start`, and which should be collapsed.
+        """
+        if self._repeat_threshold is None:
+            return []
+
+        keys = [(tb.tb_frame.f_code, tb.tb_lineno) for tb in tracebacks]
+        count = len(keys)
+        repetitions = []
+
+        i = 0
+        while i < count:
+            best = None
+            for period in range(1, MAX_REPEATED_PERIOD + 1):
+                if i + 2 * period > count:
+                    break
+
+                block = keys[i:i + period]
+                repeats = 1
+                j = i + period
+                while keys[j:j + period] == block:
+                    repeats += 1
+                    j += period
+
+                if repeats - 1 >= self._repeat_threshold and (best is None or period * repeats > best[0] * best[1]):
+                    best = (period, repeats)
+
+            if best is None:
+                i += 1
+            else:
+                repetitions.append((i,) + best)
+                i += best[0] * best[1]
+
+        return repetitions
+
+    def format_repetition(self, period, repeats):
+        frames = 'frame' if period == 1 else '{} frames'.format(period)
+        times = 'time' if repeats == 1 else 'times'
+        return '  [Previous {} repeated {} more {}]\n'.format(frames, repeats, times)
+
+    def get_folds(self, actions, repetitions):
+        """Find the runs of consecutive plain frames which should be folded.
+
+        Returns a dict mapping the index of the first frame of each run to
+        its length. The frames of collapsed repetitions are not folded.
+        """
+        if self._fold_frames is None:
+            return {}
+
+        repeated = set()
+        for start, period, repeats in repetitions:
+            repeated.update(range(start, start + period * repeats))
+
+        folds = {}
+        run_start = None
+        # the last frame is never folded, its source is needed for the title
+        for i, action in enumerate(actions[:-1] + [None]):
+            if action == PLAIN and i not in repeated:
+                if run_start is None:
+                    run_start = i
+                continue
 
+            if run_start is not None and i - run_start >= self._fold_frames:
+                folds[run_start] = i - run_start
+            run_start = None
+
+        return folds
+
+    def format_folded(self, count):
+        frames = 'frame' if count == 1 else 'frames'
+        return '  [{} library {} folded]\n'.format(count, frames)
+
+    def estimate_frame(self, tb, action):
+        """Estimate the bytes a frame will take once formatted, without reading its source nor its values."""
+        code = tb.tb_frame.f_code
+        size = len(self.format_location(code.co_filename, tb.tb_lineno, code.co_name, 'x' * ESTIMATED_SOURCE_LENGTH))
+        if action == INSPECT:
+            value_length = MAX_LENGTH if self._max_length is None else self._max_length
+            size += ESTIMATED_VALUES * (ESTIMATED_SOURCE_LENGTH // 2 + value_length + 5)
+        return size
+
+    def get_units(self, tracebacks, collapsed, folded):
+        """Split a traceback into the units displayed on their own, which are elided as a whole.
+
+        Returns a list of (start, end, record) tuples, for the frames from
+        `start` to `end`: either a displayed frame, with the
+        `RepetitionRecord` collapsed after it (or None), or a folded run and
+        its `FoldedRecord`.
+        """
+        units = []
+        i = 0
+        while i < len(tracebacks):
+            if i in folded:
+                units.append((i, i + folded[i], FoldedRecord(folded[i])))
+                i += folded[i]
+                continue
+
+            if i + 1 in collapsed:
+                period, repeats = collapsed[i + 1]
+                units.append((i, i + 1 + period * (repeats - 1), RepetitionRecord(period, repeats)))
+            else:
+                units.append((i, i + 1, None))
+            i = units[-1][1]
+
+        return units
+
+    def estimate_unit(self, tracebacks, actions, unit):
+        start, _, record = unit
+        if isinstance(record, FoldedRecord):
+            return get_size(self.format_folded(record.count))
+
+        size = self.estimate_frame(tracebacks[start], actions[start])
+        if record is not None:
+            size += get_size(self.format_repetition(record.period, record.repeats - 1))
+        return size
+
+    def get_elision(self, tracebacks, actions, units, room):
+        """Decide which units are elided for the output to fit in `room` bytes, before formatting any.
+
+        The last unit is not counted, it is rendered beforehand. Past the
+        budget, all the units but the ones of the first and last `keep_frames`
+        displayed frames are elided. Returns the positions of the first
+        elided unit and of the first one kept after, or None.
+        """
+        size = sum(self.estimate_unit(tracebacks, actions, unit) for unit in units[:-1])
+        frames = [position for position, unit in enumerate(units) if not isinstance(unit[2], FoldedRecord)]
+
+        # the last frame is never elided, its source is needed for the title
+        keep = max(self._keep_frames, 1)
+        if size <= room or len(frames) <= 2 * keep:
+            return None
+
+        return frames[keep], frames[-keep]
+
+    def fit_frames(self, tracebacks, actions, units, deadline, memo, reserved):
+        """Render the units of a traceback within the output budget, minus `reserved` bytes.
+
+        The last frame is rendered first and always displayed, its values cut
+        to half of the budget if there are other frames. Then the units kept
+        by `get_elision()` are rendered from both ends towards the middle, the
+        values of each one cut to its share of what is left of the budget, and
+        the elision is widened to the first unit which does not fit. The
+        elided units are neither read nor inspected.
+        """
+        skipped = [False]
+
+        def render(position, room):
+            start, _, record = units[position]
+            if isinstance(record, FoldedRecord):
+                return [record], get_size(self.format_folded(record.count))
+
+            frame, skipped[0] = self.get_frame_record(tracebacks[start], actions[start], deadline, memo,
+                                                      skipped[0], room)
+            size = get_size(self.format_location(*self.format_frame(frame)[0]))
+            if record is None:
+                return [frame], size
+            return [frame, record], size + get_size(self.format_repetition(record.period, record.repeats - 1))
+
+        room = self._output_budget - reserved
+        innermost = len(units) - 1
+        last, size = render(innermost, room // 2 if innermost else room)
+        # the line announcing the elided frames must fit as well
+        room -= size + get_size(self.format_elided(len(tracebacks)))
+
+        elision = self.get_elision(tracebacks, actions, units, room)
+        head_end, tail_start = (innermost, innermost) if elision is None else elision
+        remaining = head_end + innermost - tail_start
+
+        tail = []
+        position = innermost
+        while position > tail_start:
+            records, size = render(position - 1, room // remaining)
+            remaining -= 1
+            if size > room:
+                break
+            room -= size
+            tail[:0] = records
+            position -= 1
+        tail_start = position
+
+        head = []
+        position = 0
+        while position < min(head_end, tail_start):
+            records, size = render(position, room // max(min(head_end, tail_start) - position, 1))
+            if size > room:
+                break
+            room -= size
+            head.extend(records)
+            position += 1
+
+        records = head
+        if position < tail_start:
+            records.append(ElidedRecord(units[tail_start][0] - units[position][0]))
+        return records + tail + last
+
+    def format_elided(self, count):
+        frames = 'frame' if count == 1 else 'frames'
+        return '  [{} {} elided]\n'.format(count, frames)
+
+    def get_title_reserve(self, exc, value):
+        """Return the bytes of the output budget kept for the header and the title of an exception."""
+        if self._output_budget is None:
+            return 0
+
+        try:
+            size = get_size(u''.join(traceback.format_exception_only(exc, value)))
+            if exc is AssertionError and not str(value):
+                # the source of the assertion is displayed instead
+                size += ESTIMATED_SOURCE_LENGTH
+        except Exception:
+            size = 0
+
+        return get_size(HEADER) + min(size, self._output_budget // 2)
+
+    def limit_title(self, title, used):
+        """Truncate a title to what is left of the output budget after `used` bytes."""
+        if self._output_budget is None:
+            return title
+
+        room = self._output_budget - used
+        if get_size(title) <= room:
+            return title
+
+        return truncate(title.rstrip(u'\n'), room - 1) + u'\n'
+
+    def format_exception_title(self, exc, value, colored_source):
         if not str(value) and exc is AssertionError:
             value.args = (colored_source,)
         title = traceback.format_exception_only(exc, value)
 
-        full_trace = u'Traceback (most recent call last):\n{}{}\n'.format(formatted, ''.join(title).strip())
+        return u'{}\n'.format(''.join(title).strip())
+
+    def iter_exception(self, exc, value, tb):
+        """Format an exception piece by piece: the header, each frame, and the title."""
+        deadline = None
+        if self._format_timeout is not None:
+            deadline = clock() + self._format_timeout
+
+        if self.stats is not None:
+            self.stats.start_exception()
 
-        return full_trace
+        yield HEADER
+
+        reserved = self.get_title_reserve(exc, value)
+        used = get_size(HEADER)
+        colored_source = ''
+        for formatted, colored in self.iter_traceback(tb, deadline, reserved):
+            if colored is not None:
+                colored_source = colored
+            if self._output_budget is not None:
+                used += get_size(formatted)
+            yield formatted
+
+        title = self.limit_title(self.format_exception_title(exc, value, colored_source), used)
+
+        if self.stats is not None:
+            self.stats.finish_exception(exc)
+
+        yield title
+
+    def format_exception(self, exc, value, tb):
+        return u''.join(self.iter_exception(exc, value, tb))
+
+    def snapshot_exception(self, exc, value, tb):
+        """Capture what is needed to format an exception later, e.g. from another thread.
+
+        The values are rendered right away: the snapshot only holds strings, and
+        does not keep the frames alive. See `format_snapshot()`.
+        """
+        deadline = None
+        if self._format_timeout is not None:
+            deadline = clock() + self._format_timeout
+
+        if self.stats is not None:
+            self.stats.start_exception()
+
+        frames = list(self.iter_frames(tb, deadline, self.get_title_reserve(exc, value)))
+
+        colored_source = ''
+        for record in frames:
+            if isinstance(record, FrameRecord):
+                colored_source = record.color_source if self._colored else record.source
+
+        title = self.format_exception_title(exc, value, colored_source)
+
+        if self.stats is not None:
+            self.stats.finish_exception(exc)
+
+        return ExceptionRecord(frames, title)
+
+    def get_exception_message(self, value):
+        try:
+            return to_unicode(str(value))
+        except Exception:
+            return u'<unprintable {} object>'.format(type(value).__name__)
+
+    def structure_frame(self, record):
+        """Return a frame, repetition, folded or elided record as a dict."""
+        if isinstance(record, RepetitionRecord):
+            return {'repeated': {'frames': record.period, 'times': record.repeats - 1}}
+        if isinstance(record, FoldedRecord):
+            return {'folded': {'frames': record.count}}
+        if isinstance(record, ElidedRecord):
+            return {'elided': {'frames': record.count}}
+
+        frame = {
+            'filename': record.filename,
+            'lineno': record.lineno,
+            'function': record.function,
+            'source': record.source,
+            'values': [{'name': name, 'column': col, 'value': val} for name, col, val in record.values],
+        }
+        if record.marker is not None:
+            frame['marker'] = record.marker
+
+        return frame
+
+    def structure_exception(self, exc, value, tb):
+        """Return an exception as plain data (dicts, lists, strings and numbers) instead of text.
+
+        Nothing is colorized on the way with a formatter which is not `colored`.
+        """
+        deadline = None
+        if self._format_timeout is not None:
+            deadline = clock() + self._format_timeout
+
+        if self.stats is not None:
+            self.stats.start_exception()
+
+        records = list(self.iter_frames(tb, deadline))
+
+        source = ''
+        for record in records:
+            if isinstance(record, FrameRecord):
+                source = record.source
+
+        structured = {
+            'type': exc.__name__,
+            'module': exc.__module__,
+            'message': self.get_exception_message(value),
+            'title': self.format_exception_title(exc, value, source).rstrip(u'\n'),
+            'frames': [self.structure_frame(record) for record in records],
+        }
+
+        if self.stats is not None:
+            self.stats.finish_exception(exc)
+
+        return structured
+
+    def format_snapshot(self, record):
+        """Format an `ExceptionRecord`, as `format_exception()` formats the live exception."""
+        lines = [HEADER]
+        lines.extend(formatted for formatted, _ in self.format_frames(record.frames))
+        formatted = u''.join(lines)
+
+        return formatted + self.limit_title(record.title, get_size(formatted))
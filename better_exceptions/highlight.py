@@ -0,0 +1,138 @@
+"""Syntax highlighting of single source lines.
+
+The line is scanned once with the token pattern of the `tokenize` module and
+colored in one linear pass: keywords, builtins, strings, numbers and
+comments. Theme functions are turned into (prefix, suffix) templates once, so
+that coloring a token is a simple concatenation.
+
+`tokenize.generate_tokens()` is not used directly: it raises on the
+unterminated brackets of lines which are a part of multi-line statements, and
+since Python 3.12 it copies the whole line into every token, which is
+quadratic on long lines.
+"""
+
+from __future__ import absolute_import
+
+import keyword
+import re
+import tokenize
+
+from .context import PY3
+
+if PY3:
+    import builtins
+else:
+    import __builtin__ as builtins
+
+
+KEYWORDS = frozenset(keyword.kwlist)
+BUILTINS = frozenset(dir(builtins))
+
+QUOTES = '\'"'
+
+_PSEUDO_TOKEN = re.compile(tokenize.PseudoToken)
+_TRIPLE_ENDS = {
+    "'''": re.compile(tokenize.Single3),
+    '"""': re.compile(tokenize.Double3),
+}
+
+_MARKER = '\x00'
+
+
+def compile_style(style):
+    """Return a (prefix, suffix) template for a theme function, or the function itself."""
+    try:
+        styled = style(_MARKER)
+    except Exception:
+        return style
+
+    if styled.count(_MARKER) != 1:
+        return style
+
+    prefix, suffix = styled.split(_MARKER)
+    return prefix, suffix
+
+
+class Highlighter(object):
+
+    def __init__(self, theme):
+        self._styles = dict((name, compile_style(style)) for name, style in theme.items())
+
+    def style(self, name, text):
+        style = self._styles[name]
+        if isinstance(style, tuple):
+            return style[0] + text + style[1]
+        return style(text)
+
+    def tokenize(self, source):
+        """Return the (type, text, start, end) of the tokens of the line."""
+        tokens = []
+        pos = 0
+        length = len(source)
+
+        while pos < length:
+            match = _PSEUDO_TOKEN.match(source, pos)
+            if match is None:
+                # e.g. the opening quote of a string continued on the next line
+                pos += 1
+                continue
+
+            start, end = match.span(1)
+            if start == end:
+                break
+
+            text = source[start:end]
+            initial = text[0]
+
+            if initial.isdigit() or (initial == '.' and text not in ('.', '...')):
+                toktype = tokenize.NUMBER
+            elif initial == '#':
+                toktype = tokenize.COMMENT
+            elif text[-3:] in _TRIPLE_ENDS:
+                # only the opening quotes of triple-quoted strings are matched
+                closing = _TRIPLE_ENDS[text[-3:]].match(source, end)
+                end = closing.end() if closing else length
+                toktype = tokenize.STRING
+            elif text[-1] in QUOTES:
+                toktype = tokenize.STRING
+            elif initial.isalpha() or initial == '_':
+                toktype = tokenize.NAME
+            else:
+                toktype = tokenize.OP
+
+            tokens.append((toktype, source[start:end], start, end))
+            pos = end
+
+        return tokens
+
+    def get_spans(self, tokens):
+        """Yield the (start, end, style) of the tokens which should be colored."""
+        previous = None
+
+        for i, (toktype, text, start, end) in enumerate(tokens):
+            if toktype == tokenize.NAME:
+                if text in KEYWORDS:
+                    yield start, end, 'keyword'
+                elif text in BUILTINS and previous != '.':
+                    following = tokens[i + 1][1] if i + 1 < len(tokens) else None
+                    if following != '=':
+                        # not a keyword argument
+                        yield start, end, 'builtin'
+            elif toktype in (tokenize.STRING, tokenize.NUMBER):
+                yield start, end, 'literal'
+            elif toktype == tokenize.COMMENT:
+                yield start, end, 'comment'
+
+            previous = text
+
+    def highlight(self, source):
+        chunks = []
+        offset = 0
+
+        for start, end, style in self.get_spans(self.tokenize(source)):
+            chunks.append(source[offset:start])
+            chunks.append(self.style(style, source[start:end]))
+            offset = end
+
+        chunks.append(source[offset:])
+        return ''.join(chunks)
@@ -0,0 +1,80 @@
+"""Formatting levels, from the cheapest to the most detailed.
+
+- `INNERMOST` (1): the frames are displayed like in the standard traceback,
+  only the values of the innermost frame are inspected;
+- `UNCOLORED` (2): the values of all the frames are inspected, nothing is
+  colorized;
+- `FULL` (3): the values of all the frames, and colors.
+
+The level is read from the `BETTER_EXCEPTIONS_LEVEL` environment variable
+(e.g. `BETTER_EXCEPTIONS_LEVEL=1`), full by default. It can drop by itself
+when the output is not a terminal, or while exceptions are raised faster than
+a given rate, see `LoadMeter`.
+"""
+
+from __future__ import absolute_import
+
+import os
+import threading
+
+from .context import clock
+
+
+INNERMOST = 1
+UNCOLORED = 2
+FULL = 3
+LEVELS = (INNERMOST, UNCOLORED, FULL)
+
+LEVEL_VARIABLE = 'BETTER_EXCEPTIONS_LEVEL'
+
+
+def check_level(level):
+    if level not in LEVELS:
+        raise ValueError('level should be one of {}, not {!r}'.format(', '.join(str(l) for l in LEVELS), level))
+    return level
+
+
+def get_environment_level(default=FULL):
+    try:
+        level = int(os.getenv(LEVEL_VARIABLE, '').strip())
+    except ValueError:
+        return default
+
+    return level if level in LEVELS else default
+
+
+def isatty(stream):
+    try:
+        return stream.isatty()
+    except Exception:
+        return False
+
+
+class LoadMeter(object):
+    """Count the exceptions formatted during windows of `window` seconds."""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self._start = clock()
+        self._count = 0
+        self._previous = 0
+        self._lock = threading.Lock()
+
+    def _roll(self, now):
+        elapsed = now - self._start
+        if elapsed >= self.window:
+            # nothing was counted in the previous window if it was skipped entirely
+            self._previous = self._count if elapsed < 2 * self.window else 0
+            self._count = 0
+            self._start = now
+
+    def add(self):
+        with self._lock:
+            self._roll(clock())
+            self._count += 1
+
+    def rate(self):
+        """Return the exceptions per second of the last window, or of the current one if it is busier."""
+        with self._lock:
+            self._roll(clock())
+            return max(self._previous, self._count) / float(self.window)
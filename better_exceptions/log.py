@@ -1,27 +1,253 @@
 from __future__ import absolute_import
 
+import atexit
+import copy
 import sys
+import threading
 
 from logging import Logger, StreamHandler
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+    # Python 2
+    QueueHandler = QueueListener = None
+
+
+QUEUE_SIZE = 1000
+
+# What to do with a record when the queue of the background thread is full:
+# wait for some room, drop the record, or format and emit it right away
+OVERFLOW_POLICIES = ('block', 'drop', 'inline')
+
+_background = None
+_installed = False
+
+
+def logging_format_exception(exc_info):
+    from . import format_exception
+    return format_exception(*exc_info)
+
+
+def needs_patch(handler):
+    formatter = handler.formatter
+    if formatter is None or getattr(handler, 'stream', None) != sys.stderr:
+        return False
+
+    if formatter.__dict__.get('formatException') is not logging_format_exception:
+        return True
+    return _background is not None and not getattr(handler, '_better_exceptions_background', False)
+
+
+def patch_handler(handler):
+    handler.formatter.formatException = logging_format_exception
+
+    if _background is not None:
+        _background.install(handler)
+
+
+def install():
+    """Patch the stderr handlers when they handle their first record, whenever they were created.
+
+    Only `StreamHandler.handle()` is wrapped, once: creating loggers or
+    handlers costs nothing, and each record only costs a few attribute
+    lookups.
+    """
+    global _installed
+
+    if _installed:
+        return
+    _installed = True
+
+    handle = StreamHandler.handle
+
+    def patched_handle(self, record):
+        if needs_patch(self):
+            patch_handler(self)
+            if 'handle' in self.__dict__:
+                # installed in the background thread from now on
+                return self.handle(record)
+        return handle(self, record)
+
+    StreamHandler.handle = patched_handle
+
 
 def patch():
     import logging
-    from . import format_exception
 
-    logging_format_exception = lambda exc_info: format_exception(*exc_info)
+    install()
 
     if hasattr(logging, '_defaultFormatter'):
         logging._defaultFormatter.format_exception = logging_format_exception
 
-    patchables = [handler() for handler in logging._handlerList if isinstance(handler(), StreamHandler)]
-    patchables = [handler for handler in patchables if handler.stream == sys.stderr]
-    patchables = [handler for handler in patchables if handler.formatter is not None]
-    for handler in patchables:
-        handler.formatter.formatException = logging_format_exception
+    # the existing handlers right away, in case their formatter is used directly
+    for ref in list(logging._handlerList):
+        handler = ref()
+        if isinstance(handler, StreamHandler) and needs_patch(handler):
+            patch_handler(handler)
+
+
+def patch_background(queue_size=QUEUE_SIZE, overflow='block'):
+    """Like `patch()`, but format the exceptions and emit the records in a background thread.
+
+    Only a snapshot of the exception (its frames and the rendered values) is
+    taken when logging, so that the logging thread is not held up by the
+    formatting and the writing of the traceback.
+    """
+    global _background
+
+    if _background is None:
+        _background = BackgroundFormatting(queue_size, overflow)
+    patch()
+
+    return _background
+
+
+def snapshot_record(record):
+    """Return a copy of a record, its exception replaced by a snapshot that another thread can format."""
+    from . import snapshot_exception
+
+    record = copy.copy(record)
+    # the arguments could be modified once the call to the logger returns
+    record.msg = record.getMessage()
+    record.args = None
+
+    if record.exc_info:
+        if record.exc_info[0] is not None and not record.exc_text:
+            record.exc_snapshot = snapshot_exception(*record.exc_info)
+        record.exc_info = None
+
+    return record
+
+
+def render_record(record):
+    """Format the exception snapshot of a record, where the formatter of a handler expects it."""
+    from . import format_snapshot
+
+    snapshot = getattr(record, 'exc_snapshot', None)
+    if snapshot is not None:
+        record.exc_text = format_snapshot(snapshot)
+        record.exc_snapshot = None
+
+    return record
+
+
+class BackgroundFormatting(object):
+
+    def __init__(self, queue_size=QUEUE_SIZE, overflow='block'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow should be one of {}, not {!r}'.format(', '.join(OVERFLOW_POLICIES), overflow))
+
+        self.queue = queue.Queue(queue_size)
+        self.overflow = overflow
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def install(self, handler):
+        """Emit the records of a handler from the background thread."""
+        if getattr(handler, '_better_exceptions_background', False):
+            return
+
+        handler.handle = lambda record: self.handle(handler, record)
+        handler._better_exceptions_background = True
+
+    def handle(self, handler, record):
+        rv = handler.filter(record)
+        if rv:
+            try:
+                record = snapshot_record(record)
+            except Exception:
+                handler.handleError(record)
+            else:
+                self.submit(handler, record)
+        return rv
+
+    def submit(self, handler, record):
+        self.start()
+
+        if self.overflow == 'block':
+            self.queue.put((handler, record))
+            return
+
+        try:
+            self.queue.put_nowait((handler, record))
+        except queue.Full:
+            if self.overflow == 'drop':
+                self.dropped += 1
+            else:
+                self.emit(handler, record)
+
+    def emit(self, handler, record):
+        try:
+            render_record(record)
+        except Exception:
+            handler.handleError(record)
+            return
+
+        handler.acquire()
+        try:
+            handler.emit(record)
+        finally:
+            handler.release()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                self.emit(*item)
+            finally:
+                self.queue.task_done()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self.run, name='better_exceptions')
+                thread.daemon = True
+                thread.start()
+                # write the records still queued before the interpreter exits
+                atexit.register(self.stop)
+                self._thread = thread
+
+    def flush(self):
+        """Wait until every queued record has been emitted."""
+        self.queue.join()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+
+if QueueHandler is not None:
+
+    class SnapshotQueueHandler(QueueHandler):
+        """A QueueHandler which sends a snapshot of the exception instead of formatting it.
+
+        The listener formats it, use it with a `SnapshotQueueListener`.
+        """
+
+        def prepare(self, record):
+            return super(SnapshotQueueHandler, self).prepare(snapshot_record(record))
+
+    class SnapshotQueueListener(QueueListener):
+
+        def prepare(self, record):
+            return render_record(super(SnapshotQueueListener, self).prepare(record))
 
 
 class BetExcLogger(Logger):
-    def __init__(self, *args, **kwargs):
-        super(BetExcLogger, self).__init__(*args, **kwargs)
-        patch()
+    """Kept for compatibility: the handlers are patched by `install()`, whatever the class of the loggers."""
@@ -0,0 +1,70 @@
+"""Formatted tracebacks, memoized per exception instance.
+
+A record logged with a traceback goes through each handler of the logger
+and of its parents, and each of them formats the traceback on its own. The
+same exception may also be logged several times while it propagates. Once
+formatted, the traceback is kept with the exception itself (in a weak map,
+or in an attribute of the exception when it cannot be weakly referenced) so
+that the following requests reuse it. Renderings with different settings
+(colored and plain, ...) are kept separately.
+"""
+
+from __future__ import absolute_import
+
+import threading
+import weakref
+
+
+ATTRIBUTE = '__better_exceptions_formatted__'
+
+
+class FormattedMemo(object):
+
+    def __init__(self):
+        self._entries = weakref.WeakKeyDictionary()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _get_variants(self, value, create):
+        try:
+            variants = self._entries.get(value)
+            if variants is None and create:
+                variants = self._entries[value] = {}
+            return variants
+        except TypeError:
+            # not weakly referenceable (e.g. any exception in Python 2) or not hashable
+            pass
+
+        variants = getattr(value, ATTRIBUTE, None)
+        if variants is None and create:
+            variants = {}
+            try:
+                setattr(value, ATTRIBUTE, variants)
+            except (AttributeError, TypeError):
+                return None
+        return variants
+
+    def _key(self, tb, variant):
+        # `variant` identifies the settings of the rendering; the traceback is a part of
+        # the key as the same exception can be re-raised, and formatted with a longer one
+        return (self._generation, variant, id(tb))
+
+    def get(self, value, tb, variant):
+        with self._lock:
+            variants = self._get_variants(value, False)
+            if variants is None:
+                return None
+            return variants.get(self._key(tb, variant))
+
+    def set(self, value, tb, variant, formatted):
+        with self._lock:
+            variants = self._get_variants(value, True)
+            if variants is not None:
+                variants[self._key(tb, variant)] = formatted
+
+    def clear(self):
+        """Forget every formatted traceback, e.g. once the settings changed."""
+        with self._lock:
+            self._entries.clear()
+            # the attributes of the exceptions are invalidated instead
+            self._generation += 1
@@ -0,0 +1,120 @@
+"""How much of each frame is displayed, depending on where its code comes from.
+
+In the traceback of a web application, most frames belong to the framework,
+its dependencies and the standard library. Their values are rarely what one
+is looking for, while inspecting them (parsing and colorizing their source,
+rendering their values) takes most of the time. A frame policy matches
+frames by path prefix or by module name (a glob), and tells whether they are
+inspected or only displayed as plain source lines, as the standard traceback
+does. The first policy which matches a frame applies.
+
+The decision only depends on the code of the frame, it is cached per code
+object.
+"""
+
+from __future__ import absolute_import
+
+import fnmatch
+import os
+
+from .cache import LRUCache
+
+
+INSPECT = 'inspect'  # the source is parsed and colorized, the values displayed
+PLAIN = 'plain'  # only the source line, as is
+FRAME_ACTIONS = (INSPECT, PLAIN)
+
+POLICY_CACHE_SIZE = 4096  # number of code objects whose policy is remembered
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def get_library_paths():
+    """Return the directories of the standard library and of the installed packages."""
+    paths = set()
+
+    try:
+        import sysconfig
+    except ImportError:
+        sysconfig = None
+
+    if sysconfig is not None:
+        scheme_paths = sysconfig.get_paths()
+        paths.update(scheme_paths[name] for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+                     if name in scheme_paths)
+
+    try:
+        import site
+        paths.update(getattr(site, 'getsitepackages', list)())
+        if getattr(site, 'getusersitepackages', None) is not None:
+            paths.add(site.getusersitepackages())
+    except Exception:
+        # e.g. the site module of old virtualenvs
+        pass
+
+    return sorted(path for path in paths if path)
+
+
+class FramePolicy(object):
+    """Apply an action to the frames whose file is under `path`, or whose module matches `module`."""
+
+    def __init__(self, action, path=None, module=None):
+        if action not in FRAME_ACTIONS:
+            raise ValueError('action should be one of {}, not {!r}'.format(', '.join(FRAME_ACTIONS), action))
+        if path is None and module is None:
+            raise ValueError('a frame policy needs a path or a module')
+
+        self.action = action
+        self.path = None if path is None else normalize_path(path)
+        self.module = module
+
+    def __repr__(self):
+        return 'FramePolicy({!r}, path={!r}, module={!r})'.format(self.action, self.path, self.module)
+
+    def matches(self, filename, module):
+        if self.path is not None:
+            if filename is None or not (filename == self.path or filename.startswith(self.path + os.sep)):
+                return False
+        if self.module is not None:
+            if module is None or not fnmatch.fnmatchcase(module, self.module):
+                return False
+        return True
+
+
+def library_policies(action=PLAIN):
+    """Return policies applying an action to the frames of the standard library and of installed packages."""
+    return tuple(FramePolicy(action, path=path) for path in get_library_paths())
+
+
+class FramePolicies(object):
+    """Find which policy applies to a frame, remembering the decision for each code object."""
+
+    def __init__(self, policies=(), default=INSPECT, cache_size=POLICY_CACHE_SIZE):
+        self.policies = tuple(policies)
+        self.default = default
+        # keyed by id, the code objects themselves are kept so that an id is not reused meanwhile
+        self._cache = LRUCache(cache_size)
+
+    def resolve(self, filename, module):
+        if filename is not None and not (filename.startswith('<') and filename.endswith('>')):
+            filename = normalize_path(filename)
+        else:
+            filename = None
+
+        for policy in self.policies:
+            if policy.matches(filename, module):
+                return policy.action
+
+        return self.default
+
+    def get_action(self, frame):
+        code = frame.f_code
+        cached = self._cache.get(id(code))
+        if cached is not None and cached[0] is code:
+            return cached[1]
+
+        action = self.resolve(code.co_filename, frame.f_globals.get('__name__'))
+        self._cache.set(id(code), (code, action))
+        return action
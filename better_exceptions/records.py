@@ -0,0 +1,83 @@
+"""Compact records of the frames of a traceback.
+
+A traceback keeps every frame it went through alive, with all their local
+variables, for as long as it is referenced. The formatter first turns the
+frames into these records, which only hold what is displayed (the location,
+the source line and the rendered values), and lays them out afterwards.
+
+`capture_exception()` returns an `ExceptionRecord`: the exception can then
+be formatted at any later time, from any thread or process, while its
+frames can be freed right away.
+"""
+
+from __future__ import absolute_import
+
+
+class _Record(object):
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__getstate__() == other.__getstate__()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(repr(value) for value in self.__getstate__()))
+
+    # records without a __dict__ can only be pickled with protocol 2 otherwise
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+class FrameRecord(_Record):
+    """A frame: its location, its source line and the (name, column, rendered value) of its values.
+
+    `marker` is an optional line displayed below the frame.
+    """
+    __slots__ = ('filename', 'lineno', 'function', 'source', 'color_source', 'values', 'marker')
+
+    def __init__(self, filename, lineno, function, source, color_source, values=(), marker=None):
+        _Record.__init__(self, filename, lineno, function, source, color_source, tuple(values), marker)
+
+
+class RepetitionRecord(_Record):
+    """The `period` frames before it, repeated `repeats` times in a row and collapsed."""
+    __slots__ = ('period', 'repeats')
+
+    def __init__(self, period, repeats):
+        _Record.__init__(self, period, repeats)
+
+
+class FoldedRecord(_Record):
+    """A run of `count` consecutive library frames, folded."""
+    __slots__ = ('count',)
+
+    def __init__(self, count):
+        _Record.__init__(self, count)
+
+
+class ElidedRecord(_Record):
+    """The `count` frames in the middle of a traceback, left out to keep its output within budget."""
+    __slots__ = ('count',)
+
+    def __init__(self, count):
+        _Record.__init__(self, count)
+
+
+class ExceptionRecord(_Record):
+    """The frame, repetition, folded and elided records of an exception, and its formatted title."""
+    __slots__ = ('frames', 'title')
+
+    def __init__(self, frames, title):
+        _Record.__init__(self, list(frames), title)
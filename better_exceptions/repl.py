@@ -1,24 +1,146 @@
+from array import array
 from code import InteractiveConsole
+from collections import OrderedDict
 import sys
 
 
 REPL_ID_PREFIX = '@@@REPL@@@'
 
+# Bytes (roughly) kept for the commands entered in the console
+REPL_MEMORY_LIMIT = 8 * 1024 * 1024
+
 
 repl = None
 
+
+def get_code_size(code):
+    """Estimate the memory used by a code object, and the code objects of its functions and classes."""
+    size = sys.getsizeof(code) + len(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            size += get_code_size(const)
+    return size
+
+
+class ReplEntry(object):
+    """A command entered in the console: its code, and its source indexed by line."""
+    __slots__ = ('code', 'filename', 'source', 'offsets', 'code_size', 'source_size')
+
+    def __init__(self, code, filename, source):
+        source = source.replace('\r\n', '\n')
+
+        # where each line starts in the source, so that any line is sliced right away
+        offsets = array('l', [0])
+        index = source.find('\n')
+        while index != -1:
+            offsets.append(index + 1)
+            index = source.find('\n', index + 1)
+
+        self.code = code
+        self.filename = filename
+        self.source = source
+        self.offsets = offsets
+        self.code_size = 0 if code is None else get_code_size(code)
+        self.source_size = sys.getsizeof(source) + offsets.itemsize * len(offsets)
+
+    def line(self, lineno):
+        if not 0 < lineno <= len(self.offsets):
+            return ''
+
+        start = self.offsets[lineno - 1]
+        end = self.offsets[lineno] - 1 if lineno < len(self.offsets) else len(self.source)
+        return self.source[start:end]
+
+
+class ReplEntries(object):
+    """The commands of a console, by id, the least recently used being dropped past a memory limit.
+
+    Code objects are only kept to be run: they are released first, the
+    sources (needed to display the tracebacks) only afterwards.
+    """
+
+    def __init__(self, memory_limit=REPL_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # the ids of the entries which still hold their code, oldest first
+        self._coded = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry_id):
+        return entry_id in self._entries
+
+    def __getitem__(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        # re-insert so that the entry becomes the most recently used one
+        self._entries[entry_id] = entry
+        return entry
+
+    def get(self, entry_id, default=None):
+        try:
+            return self[entry_id]
+        except KeyError:
+            return default
+
+    def add(self, entry_id, code, filename, source):
+        self.discard(entry_id)
+
+        entry = ReplEntry(code, filename, source)
+        self._entries[entry_id] = entry
+        self.size += entry.source_size + entry.code_size
+        if entry.code is not None:
+            self._coded[entry_id] = None
+
+        self.evict()
+        return entry
+
+    def discard(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            self._coded.pop(entry_id, None)
+            self.size -= entry.source_size + entry.code_size
+
+    def evict(self):
+        """Release code objects, then whole entries, until the entries fit in the memory limit.
+
+        The most recent entry is always kept.
+        """
+        if self.memory_limit is None:
+            return
+
+        while self.size > self.memory_limit and self._coded:
+            entry_id, _ = self._coded.popitem(last=False)
+            entry = self._entries[entry_id]
+            self.size -= entry.code_size
+            entry.code = None
+            entry.code_size = 0
+
+        while self.size > self.memory_limit and len(self._entries) > 1:
+            entry_id, entry = self._entries.popitem(last=False)
+            self.size -= entry.source_size + entry.code_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._coded.clear()
+        self.size = 0
+
+
 class BetterExceptionsConsole(InteractiveConsole, object):
-    def __init__(self):
+    def __init__(self, memory_limit=REPL_MEMORY_LIMIT):
         super(BetterExceptionsConsole, self).__init__()
         self.last_command = None
-        self.entries = dict()
+        self.entries = ReplEntries(memory_limit)
         self.last_code = None
         self.last_id = None
         self.counter = 0
 
     def runcode(self, code):
         assert self.last_code is not None
-        self.entries[self.last_id] = (code,) + self.last_code
+        self.entries.add(self.last_id, code, *self.last_code)
         return super(BetterExceptionsConsole, self).runcode(code)
 
     def runsource(self, source, loc='<input>', symbol='single'):
@@ -43,8 +165,8 @@ def get_repl():
     return repl
 
 
-def interact(quiet=False):
+def interact(quiet=False, memory_limit=REPL_MEMORY_LIMIT):
     global repl
-    repl = BetterExceptionsConsole()
+    repl = BetterExceptionsConsole(memory_limit)
     banner = '' if quiet else None
     repl.interact(banner)
@@ -0,0 +1,338 @@
+"""Size-bounded repr.
+
+`BoundedRepr.repr()` renders values the same way `repr()` does, but stops
+producing output as soon as the length limit is reached. Huge buffers and
+containers are therefore never rendered entirely just to be truncated.
+
+Builtin containers and strings are rendered piece by piece, as well as
+their subclasses which do not define their own `__repr__()` and the
+containers of `collections`. Their items are read the way `repr()` reads
+them: through the builtin type for strings, lists, tuples and dicts, whatever
+a subclass overrides, but through an overridden `__iter__()` for sets and
+deques. The subclasses of OrderedDict which override how it is read go
+through `repr()`. Large array-like objects (anything with a
+`shape`, a `dtype` and a `size`) are summarized, and any other object goes
+through its own `repr()`. The way a
+type is rendered can be overridden with `register()`, or its values not be
+displayed at all (e.g. modules or functions). The override of a type is
+looked up through its MRO once, and remembered.
+"""
+
+from __future__ import absolute_import
+
+import sys
+from collections import Counter, OrderedDict, defaultdict, deque
+
+from .context import PY3
+
+
+if PY3:
+    TEXT_TYPES = (str, bytes)
+    _dict_items = dict.items
+else:
+    TEXT_TYPES = (str, unicode)
+    _dict_items = dict.iteritems
+
+ARRAY_THRESHOLD = 1000
+
+# OrderedDict is displayed like a dict since Python 3.12, as a list of pairs before
+ORDERED_DICT_AS_DICT = sys.version_info >= (3, 12)
+
+# Methods through which repr() may read an OrderedDict
+ORDERED_DICT_READERS = ('__iter__', '__getitem__', 'items', 'keys', '__len__')
+
+# Per-type overrides, see `register()`
+OVERRIDES = {}
+
+# Registered instead of a function, for the values which should not be displayed
+SKIP = object()
+
+RESOLVED_CACHE_SIZE = 1024  # number of types whose override is remembered
+
+# Incremented on each registration, so that the overrides are resolved again
+_version = 0
+
+
+def register(cls, func):
+    """Render instances of `cls` (and of its subclasses) with `func(value)`.
+
+    With `SKIP` instead of a function, the variables holding such instances
+    are not displayed (they are still rendered inside containers).
+    """
+    global _version
+
+    OVERRIDES[cls] = func
+    _version += 1
+
+
+class _Exhausted(Exception):
+    pass
+
+
+class _Output(object):
+    __slots__ = ('parts', 'length', 'limit')
+
+    def __init__(self, limit):
+        self.parts = []
+        self.length = 0
+        self.limit = limit
+
+    def write(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+        if self.length > self.limit:
+            raise _Exhausted()
+
+
+class BoundedRepr(object):
+
+    def __init__(self, max_length, overrides=OVERRIDES, array_threshold=ARRAY_THRESHOLD):
+        self.max_length = max_length
+        self.overrides = overrides
+        self.array_threshold = array_threshold
+        self._resolved = {}
+        self._resolved_version = None
+        self._resolved_writers = {}
+
+        self._writers = {
+            list: self._write_list,
+            tuple: self._write_tuple,
+            dict: self._write_dict,
+            set: self._write_set,
+            frozenset: self._write_set,
+            OrderedDict: self._write_ordered_dict,
+            defaultdict: self._write_defaultdict,
+            Counter: self._write_counter,
+            deque: self._write_deque,
+        }
+
+        for cls in TEXT_TYPES:
+            self._writers[cls] = self._write_text
+
+        if PY3:
+            self._writers[bytearray] = self._write_bytearray
+
+    def repr(self, value, limit=None):
+        """Render a value, cut past `max_length`, or past `limit` if it is shorter."""
+        if self.max_length is not None:
+            limit = self.max_length if limit is None else min(limit, self.max_length)
+        if limit is None:
+            limit = float('inf')
+        output = _Output(limit)
+
+        try:
+            self._write(value, output, set())
+        except _Exhausted:
+            pass
+        except RuntimeError:
+            # too deeply nested for us, let the builtin repr deal with it
+            output = _Output(limit)
+            output.parts.append(repr(value))
+
+        text = ''.join(output.parts)
+        if len(text) > limit:
+            text = text[:limit] + '...'
+        return text
+
+    def find_override(self, cls):
+        if not self.overrides:
+            return None
+
+        version = (_version, len(self.overrides))
+        if version != self._resolved_version or len(self._resolved) >= RESOLVED_CACHE_SIZE:
+            self._resolved.clear()
+            self._resolved_version = version
+
+        try:
+            return self._resolved[cls]
+        except KeyError:
+            pass
+
+        override = None
+        for base in getattr(cls, '__mro__', (cls,)):
+            if base in self.overrides:
+                override = self.overrides[base]
+                break
+
+        self._resolved[cls] = override
+        return override
+
+    def find_writer(self, cls):
+        """Return the writer of the closest base of `cls` which has one, unless a class overrides `__repr__()` before."""
+        try:
+            return self._resolved_writers[cls]
+        except KeyError:
+            pass
+
+        writer = None
+        for base in getattr(cls, '__mro__', (cls,)):
+            writer = self._writers.get(base)
+            if writer is not None or '__repr__' in vars(base):
+                break
+
+        if len(self._resolved_writers) >= RESOLVED_CACHE_SIZE:
+            self._resolved_writers.clear()
+        self._resolved_writers[cls] = writer
+        return writer
+
+    def skips(self, value):
+        """Tell whether a variable holding this value should not be displayed."""
+        return self.find_override(type(value)) is SKIP
+
+    def _write(self, value, output, active):
+        cls = type(value)
+
+        override = self.find_override(cls)
+        if override is not None and override is not SKIP:
+            output.write(override(value))
+            return
+
+        writer = self.find_writer(cls)
+        if writer is not None:
+            writer(value, output, active)
+        elif self._is_large_array(value):
+            output.write('<{} shape={} dtype={}>'.format(cls.__name__, value.shape, value.dtype))
+        else:
+            output.write(repr(value))
+
+    def _is_large_array(self, value):
+        try:
+            return (hasattr(value, 'shape') and hasattr(value, 'dtype')
+                    and value.size > self.array_threshold)
+        except Exception:
+            return False
+
+    def _write_text(self, value, output, active):
+        if type(value) not in TEXT_TYPES:
+            # a copy of the text itself, whatever a subclass overrides
+            for base in TEXT_TYPES:
+                if isinstance(value, base):
+                    value = base.__getitem__(value, slice(None))
+                    break
+
+        remaining = output.limit - output.length
+        if len(value) <= remaining:
+            output.write(repr(value))
+            return
+
+        # every character takes at least one character in the repr, so a
+        # prefix is enough to exhaust the output (minus the closing quote)
+        prefix = value[:int(remaining) + 1]
+
+        single, double = (b"'", b'"') if PY3 and isinstance(value, bytes) else ("'", '"')
+        if single in value:
+            # repr() picks the quotes depending on the whole value: append the
+            # quote that makes it pick the same ones for the prefix
+            forced = double if double in value else single
+            output.write(repr(prefix + forced)[:-2])
+        else:
+            output.write(repr(prefix)[:-1])
+
+    def _write_bytearray(self, value, output, active):
+        output.write(type(value).__name__ + '(')
+        remaining = output.limit - output.length
+        prefix = bytearray.__getitem__(value, slice(0, int(min(remaining + 1, bytearray.__len__(value)))))
+        self._write_text(bytes(prefix), output, active)
+        output.write(')')
+
+    def _write_items(self, value, items, output, active, opening, closing, recursion, write_item):
+        key = id(value)
+        if key in active:
+            output.write(recursion)
+            return
+
+        active.add(key)
+        output.write(opening)
+
+        first = True
+        for item in items:
+            if not first:
+                output.write(', ')
+            first = False
+            write_item(item, output, active)
+
+        output.write(closing)
+        active.discard(key)
+
+    def _write_list(self, value, output, active):
+        self._write_items(value, list.__iter__(value), output, active, '[', ']', '[...]', self._write)
+
+    def _write_tuple(self, value, output, active):
+        closing = ',)' if tuple.__len__(value) == 1 else ')'
+        self._write_items(value, tuple.__iter__(value), output, active, '(', closing, '(...)', self._write)
+
+    def _write_dict(self, value, output, active):
+        self._write_pairs(value, _dict_items(value), output, active, '{', '}')
+
+    def _write_set(self, value, output, active):
+        base = set if isinstance(value, set) else frozenset
+        if not base.__len__(value):
+            output.write(repr(value))
+            return
+
+        name = type(value).__name__
+        if PY3:
+            opening, closing = ('{', '}') if name == 'set' else (name + '({', '})')
+        else:
+            opening, closing = name + '([', '])'
+
+        self._write_items(value, value, output, active, opening, closing, name + '(...)', self._write)
+
+    def _write_pairs(self, value, pairs, output, active, opening, closing, recursion='{...}'):
+        def write_pair(pair, output, active):
+            self._write(pair[0], output, active)
+            output.write(': ')
+            self._write(pair[1], output, active)
+
+        self._write_items(value, pairs, output, active, opening, closing, recursion, write_pair)
+
+    def _write_ordered_dict(self, value, output, active):
+        cls = type(value)
+        if cls is not OrderedDict and any(name in vars(base) for base in cls.__mro__[:cls.__mro__.index(OrderedDict)]
+                                          for name in ORDERED_DICT_READERS):
+            # which of these repr() calls depends on the version of Python
+            output.write(repr(value))
+            return
+
+        name = cls.__name__
+        pairs = ((key, dict.__getitem__(value, key)) for key in OrderedDict.__iter__(value))
+        if not dict.__len__(value):
+            output.write(name + '()')
+        elif ORDERED_DICT_AS_DICT:
+            self._write_pairs(value, pairs, output, active, name + '({', '})', '...')
+        else:
+            self._write_items(value, pairs, output, active, name + '([', '])', '...', self._write)
+
+    def _write_defaultdict(self, value, output, active):
+        name = type(value).__name__ if PY3 else 'defaultdict'
+        output.write('{}({!r}, '.format(name, value.default_factory))
+        self._write_dict(value, output, active)
+        output.write(')')
+
+    def _write_counter(self, value, output, active):
+        name = type(value).__name__
+        if not value:
+            output.write(name + '()')
+            return
+
+        try:
+            # the most common first, as repr() does
+            pairs = value.most_common()
+        except TypeError:
+            output.write(name + '(')
+            self._write_dict(value, output, active)
+            output.write(')')
+        else:
+            self._write_pairs(value, pairs, output, active, name + '({', '})')
+
+    def _write_deque(self, value, output, active):
+        if id(value) in active:
+            output.write('[...]')
+            return
+
+        name = type(value).__name__ if PY3 else 'deque'
+        output.write(name + '(')
+        self._write_items(value, value, output, active, '[', ']', '[...]', self._write)
+        if value.maxlen is not None:
+            output.write(', maxlen={}'.format(value.maxlen))
+        output.write(')')
@@ -0,0 +1,274 @@
+"""Where the formatter reads the source lines of the frames from.
+
+`linecache` reads whole files and keeps them, as lists of lines, for the
+lifetime of the process. That is fine for hand-written modules, much less so
+for generated modules of tens of megabytes. The formatter asks a chain of
+providers instead, the first one which handles a file wins:
+
+- `MmapSourceProvider` maps large files in memory, indexes where their lines
+  start as far as needed, and only decodes the requested lines (their whole
+  source is never decoded nor parsed, the lines of their multi-line
+  statements are displayed without values);
+- `LinecacheSourceProvider` reads the other files through `linecache`;
+- `ZipSourceProvider` reads the modules imported from zip archives;
+- `LoaderSourceProvider` asks the `__loader__` of the module for its source.
+
+The providers which cache something keep only a bounded number of files, the
+least recently used being dropped.
+"""
+
+from __future__ import absolute_import
+
+import io
+import linecache
+import os
+import zipfile
+from array import array
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+try:
+    from tokenize import detect_encoding
+except ImportError:
+    # Python 2, where the lines are left encoded, as linecache does
+    detect_encoding = None
+
+from .cache import LRUCache
+
+
+MMAP_MIN_SIZE = 1024 * 1024  # files smaller than this are read through linecache
+MMAP_MAX_FILES = 8  # number of large files kept mapped
+MAX_SOURCES = 32  # number of zipped or loaded sources kept
+
+
+def split_lines(source):
+    """Split a source in lines ending with their newline, as linecache does."""
+    lines = source.replace('\r\n', '\n').split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def decode_source(data):
+    if detect_encoding is None:
+        return data
+
+    try:
+        encoding, _ = detect_encoding(io.BytesIO(data).readline)
+    except SyntaxError:
+        encoding = 'utf-8'
+    return data.decode(encoding, 'replace')
+
+
+class SourceProvider(object):
+    """Read the lines of some files; None is returned for the files which are not handled."""
+
+    def get_lines(self, filename, module_globals=None):
+        return None
+
+    def get_line(self, filename, lineno, module_globals=None):
+        lines = self.get_lines(filename, module_globals)
+        if lines is None:
+            return None
+
+        if 0 < lineno <= len(lines):
+            return lines[lineno - 1]
+        return ''
+
+    def get_source(self, filename, module_globals=None):
+        """Return the whole source of a file, '' if it is too large to be parsed."""
+        lines = self.get_lines(filename, module_globals)
+        if lines is None:
+            return None
+
+        return ''.join(lines)
+
+    def checkcache(self, filename):
+        """Forget what is known about a file if it changed."""
+
+
+class MappedFile(object):
+    """A file mapped in memory, with the offsets of the lines found so far."""
+    __slots__ = ('mapping', 'offsets', 'complete', 'encoding', 'stamp')
+
+    def __init__(self, filename, stamp):
+        with open(filename, 'rb') as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # 4 bytes per line, unless the file is too big for it
+        self.offsets = array('I' if len(self.mapping) < 2 ** 32 else 'L', [0])
+        self.complete = False
+        self.stamp = stamp
+
+        self.encoding = None
+        if detect_encoding is not None:
+            self.mapping.seek(0)
+            self.encoding, _ = detect_encoding(self.mapping.readline)
+
+    def line(self, lineno):
+        offsets = self.offsets
+        mapping = self.mapping
+        size = len(mapping)
+
+        while len(offsets) <= lineno and not self.complete:
+            end = mapping.find(b'\n', offsets[-1])
+            if end == -1 or end + 1 == size:
+                self.complete = True
+            else:
+                offsets.append(end + 1)
+
+        if not 0 < lineno <= len(offsets):
+            return ''
+
+        start = offsets[lineno - 1]
+        end = offsets[lineno] if lineno < len(offsets) else size
+        line = mapping[start:end]
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+
+        return line if self.encoding is None else line.decode(self.encoding, 'replace')
+
+
+class MmapSourceProvider(SourceProvider):
+    """Read the lines of large files from a memory mapping, without keeping them."""
+
+    def __init__(self, min_size=MMAP_MIN_SIZE, max_files=MMAP_MAX_FILES):
+        self.min_size = min_size
+        self._files = LRUCache(max_files)
+
+    def get_file(self, filename):
+        if mmap is None:
+            return None
+
+        try:
+            stat = os.stat(filename)
+        except (OSError, TypeError, ValueError):
+            return None
+
+        if stat.st_size < max(self.min_size, 1):
+            return None
+
+        stamp = (stat.st_mtime, stat.st_size)
+        mapped = self._files.get(filename)
+        if mapped is None or mapped.stamp != stamp:
+            try:
+                mapped = MappedFile(filename, stamp)
+            except (IOError, OSError, ValueError, SyntaxError):
+                return None
+            self._files.set(filename, mapped)
+
+        return mapped
+
+    def get_line(self, filename, lineno, module_globals=None):
+        mapped = self.get_file(filename)
+        return None if mapped is None else mapped.line(lineno)
+
+    def get_source(self, filename, module_globals=None):
+        # decoding and parsing the whole file would defeat the mapping
+        return None if self.get_file(filename) is None else ''
+
+    def checkcache(self, filename):
+        # the stamp of the file is checked on every access
+        pass
+
+
+class LinecacheSourceProvider(SourceProvider):
+
+    def get_lines(self, filename, module_globals=None):
+        return linecache.getlines(filename) or None
+
+    def checkcache(self, filename):
+        linecache.checkcache(filename)
+
+
+class ZipSourceProvider(SourceProvider):
+    """Read the modules imported from a zip archive, e.g. `/path/to/archive.zip/package/module.py`."""
+
+    def __init__(self, max_sources=MAX_SOURCES):
+        self._lines = LRUCache(max_sources)
+
+    def split_path(self, filename):
+        """Return the path of the archive and the name of the file in it, or None."""
+        archive, inner = filename, []
+        while True:
+            head, tail = os.path.split(archive)
+            if not tail or head == archive:
+                return None
+            inner.append(tail)
+            archive = head
+            if os.path.isfile(archive):
+                break
+
+        if not zipfile.is_zipfile(archive):
+            return None
+
+        return archive, '/'.join(reversed(inner))
+
+    def get_lines(self, filename, module_globals=None):
+        lines = self._lines.get(filename)
+        if lines is not None:
+            return lines
+
+        try:
+            split = self.split_path(filename)
+            if split is None:
+                return None
+            archive, name = split
+            with zipfile.ZipFile(archive) as zf:
+                data = zf.read(name)
+        except (IOError, OSError, KeyError, ValueError, zipfile.BadZipfile):
+            return None
+
+        lines = split_lines(decode_source(data))
+        self._lines.set(filename, lines)
+        return lines
+
+    def checkcache(self, filename):
+        self._lines.pop(filename)
+
+
+class LoaderSourceProvider(SourceProvider):
+    """Ask the loader of the module of a frame for its source (PEP 302)."""
+
+    def __init__(self, max_sources=MAX_SOURCES):
+        self._lines = LRUCache(max_sources)
+
+    def get_lines(self, filename, module_globals=None):
+        lines = self._lines.get(filename)
+        if lines is not None or not module_globals:
+            return lines
+
+        # like linecache.lazycache(), the source of the module is only used for its own file
+        if filename.startswith('<') and filename.endswith('>'):
+            return None
+        if module_globals.get('__file__', filename) != filename:
+            return None
+
+        name = module_globals.get('__name__')
+        get_source = getattr(module_globals.get('__loader__'), 'get_source', None)
+        if name is None or get_source is None:
+            return None
+
+        try:
+            source = get_source(name)
+        except Exception:
+            return None
+
+        if source is None:
+            return None
+
+        lines = split_lines(source)
+        self._lines.set(filename, lines)
+        return lines
+
+    def checkcache(self, filename):
+        self._lines.pop(filename)
+
+
+def default_providers():
+    return (MmapSourceProvider(), LinecacheSourceProvider(), ZipSourceProvider(), LoaderSourceProvider())
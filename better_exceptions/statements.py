@@ -0,0 +1,81 @@
+"""Index of the statements of a source file.
+
+A line that is only a part of a multi-line statement (a call spread over
+several lines, a long condition, ...) cannot be parsed on its own. The
+`StatementIndex` parses a whole file once and maps every line to the
+statement it belongs to, so that the names used on any line can be found
+without parsing again.
+"""
+
+from __future__ import absolute_import
+
+import ast
+from bisect import bisect_right
+
+
+def iter_header(node):
+    """Walk a statement without descending into the statements of its body."""
+    todo = [node]
+    while todo:
+        current = todo.pop()
+        yield current
+        for _, value in ast.iter_fields(current):
+            children = value if isinstance(value, list) else [value]
+            for child in children:
+                if isinstance(child, ast.AST) and not isinstance(child, (ast.stmt, ast.excepthandler)):
+                    todo.append(child)
+
+
+class StatementIndex(object):
+
+    def __init__(self, source):
+        self.starts = []
+        self.statements = []
+
+        try:
+            tree = ast.parse(source, mode='exec')
+        except (SyntaxError, ValueError, TypeError):
+            return
+
+        statements = []
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.stmt, ast.excepthandler)):
+                continue
+
+            nodes = [n for n in iter_header(node) if hasattr(n, 'lineno')]
+
+            # the end of a compound statement is the end of its header, not of its body
+            ends = [node.lineno]
+            ends.extend(self._end(n) for n in nodes if n is not node)
+            if not self._has_body(node):
+                ends.append(self._end(node))
+
+            statements.append((min(n.lineno for n in nodes), max(ends), nodes))
+
+        statements.sort(key=lambda s: s[0])
+        self.starts = [start for start, _, _ in statements]
+        self.statements = statements
+
+    @staticmethod
+    def _end(node):
+        # end_lineno is only available since Python 3.8
+        return getattr(node, 'end_lineno', None) or node.lineno
+
+    @staticmethod
+    def _has_body(node):
+        return any(isinstance(value, list) and value and isinstance(value[0], ast.stmt)
+                   for _, value in ast.iter_fields(node))
+
+    def find(self, lineno):
+        """Return the (start, end, nodes) of the statements spanning the given line."""
+        found = []
+        i = bisect_right(self.starts, lineno) - 1
+        while i >= 0:
+            start, end, nodes = self.statements[i]
+            if end < lineno:
+                break
+            found.append((start, end, nodes))
+            i -= 1
+
+        found.reverse()
+        return found
@@ -0,0 +1,127 @@
+"""Opt-in timing of the phases of formatting an exception.
+
+Pass a `FormatStats` to the formatter (`configure(stats=FormatStats())`) to
+find out where the time goes when an exception is slow to render: looking
+up the source, parsing it, colorizing it, rendering the values, laying out
+the frame, and encoding and writing the output. Durations and counts are
+accumulated per phase, per frame and per type of value, and an optional
+callback receives a report after each exception.
+"""
+
+from __future__ import absolute_import
+
+import threading
+
+from .context import clock
+
+
+PHASES = ('source', 'parse', 'colorize', 'repr', 'layout', 'encode')
+
+# Frames and types counted once the tables are full
+OTHER = '<other>'
+
+
+class FormatStats(object):
+
+    def __init__(self, callback=None, max_entries=1000):
+        """`callback(report)` is called after each exception, see `finish_exception()`."""
+        self.callback = callback
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.exceptions = 0
+            self.frames = 0
+            self.seconds = 0.0
+            self.phases = dict((phase, [0, 0.0]) for phase in PHASES)
+            self.by_frame = {}
+            self.by_type = {}
+
+    def _count(self, table, key, duration):
+        if key not in table and len(table) >= self.max_entries:
+            key = OTHER
+        entry = table.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += duration
+
+    def add(self, phase, duration):
+        with self._lock:
+            entry = self.phases[phase]
+            entry[0] += 1
+            entry[1] += duration
+
+        current = getattr(self._local, 'current', None)
+        if current is not None:
+            current[phase] += duration
+
+    def add_value(self, cls, duration):
+        """Count the rendering of a value of the given type."""
+        self.add('repr', duration)
+        with self._lock:
+            self._count(self.by_type, '{}.{}'.format(cls.__module__, cls.__name__), duration)
+
+    def add_frame(self, filename, lineno, function, duration):
+        with self._lock:
+            self.frames += 1
+            self._count(self.by_frame, (filename, lineno, function), duration)
+
+        current = getattr(self._local, 'current', None)
+        if current is not None:
+            current['frames'] += 1
+
+    def start_exception(self):
+        current = dict.fromkeys(PHASES, 0.0)
+        current['frames'] = 0
+        current['start'] = clock()
+        self._local.current = current
+
+    def finish_exception(self, exc):
+        """Count a formatted exception, and report its durations to the callback.
+
+        The report is a dict with the name of the exception, the number of
+        frames, the total and the per-phase durations (in seconds). Encoding
+        is not included, as the output is written once formatting is over.
+        """
+        current = getattr(self._local, 'current', None)
+        if current is None:
+            return
+        self._local.current = None
+
+        seconds = clock() - current.pop('start')
+        with self._lock:
+            self.exceptions += 1
+            self.seconds += seconds
+
+        if self.callback is not None:
+            report = {
+                'exception': getattr(exc, '__name__', str(exc)),
+                'frames': current.pop('frames'),
+                'seconds': seconds,
+                'phases': current,
+            }
+            try:
+                self.callback(report)
+            except Exception:
+                # instrumentation must never prevent an exception from being shown
+                pass
+
+    def slowest(self, table, count=10):
+        """Return the `count` (key, calls, seconds) entries of a table which took the longest."""
+        with self._lock:
+            entries = [(key, calls, seconds) for key, (calls, seconds) in table.items()]
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return entries[:count]
+
+    def snapshot(self):
+        """Return a copy of the cumulative counters, e.g. to export them as metrics."""
+        with self._lock:
+            return {
+                'exceptions': self.exceptions,
+                'frames': self.frames,
+                'seconds': self.seconds,
+                'phases': dict((phase, {'count': count, 'seconds': seconds})
+                               for phase, (count, seconds) in self.phases.items()),
+            }
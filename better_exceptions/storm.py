@@ -0,0 +1,137 @@
+"""Protection against storms of identical exceptions.
+
+When a dependency goes down, the same exception can be raised and logged
+thousands of times per second. Formatting each of them fully (reading and
+parsing sources, rendering values) only adds to the load.
+
+`StormGuard` fingerprints an exception from its type and the locations of
+its frames, without formatting anything. Within a time window, only the
+first occurrence of a fingerprint is fully formatted, the following ones are
+summarized on one line. The counters of the windows which are over are
+flushed on the next check, and can be reported to a callback. Those still
+pending when the interpreter exits are reported then, see `flush()`.
+"""
+
+from __future__ import absolute_import
+
+import threading
+import traceback
+import weakref
+from collections import OrderedDict
+
+from .context import clock
+
+
+MAX_FINGERPRINTS = 1024
+ATTRIBUTE = '__better_exceptions_storm__'
+
+
+class _Occurrences(object):
+    __slots__ = ('start', 'count', 'first', 'title')
+
+    def __init__(self, start, first):
+        self.start = start
+        self.count = 1
+        self.title = None
+
+        try:
+            self.first = weakref.ref(first)
+        except TypeError:
+            # the built-in exceptions cannot be weakly referenced, the first one is marked instead
+            self.first = None
+            try:
+                setattr(first, ATTRIBUTE, self)
+            except (AttributeError, TypeError):
+                pass
+
+    def is_first(self, value):
+        if self.first is not None:
+            return self.first() is value
+        return getattr(value, ATTRIBUTE, None) is self
+
+
+class StormGuard(object):
+
+    def __init__(self, window, report=None, max_fingerprints=MAX_FINGERPRINTS):
+        """`report(totals)` receives the (title, count) of the repeated exceptions of each flush."""
+        self.window = window
+        self.report = report
+        self.max_fingerprints = max_fingerprints
+        self._occurrences = OrderedDict()
+        self._next_flush = clock() + window
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(exc, tb):
+        locations = []
+        while tb is not None:
+            locations.append((tb.tb_frame.f_code.co_filename, tb.tb_lineno))
+            tb = tb.tb_next
+        return (exc, tuple(locations))
+
+    @staticmethod
+    def get_title(exc, value):
+        return ''.join(traceback.format_exception_only(exc, value)).strip().split('\n')[-1]
+
+    def check(self, exc, value, tb):
+        """Return None if the exception should be fully formatted, or else a one-line summary."""
+        now = clock()
+        fingerprint = self.fingerprint(exc, tb)
+        totals = None
+
+        with self._lock:
+            if now >= self._next_flush:
+                totals = self._flush(now)
+
+            occurrences = self._occurrences.get(fingerprint)
+            if occurrences is None or now - occurrences.start >= self.window:
+                self._occurrences.pop(fingerprint, None)
+                self._occurrences[fingerprint] = _Occurrences(now, value)
+                while len(self._occurrences) > self.max_fingerprints:
+                    self._occurrences.popitem(last=False)
+                occurrences = None
+            elif not occurrences.is_first(value):
+                # the first one may be formatted again, e.g. by several logging handlers
+                occurrences.count += 1
+                count, elapsed = occurrences.count, now - occurrences.start
+            else:
+                occurrences = None
+
+        if totals and self.report is not None:
+            self.report(totals)
+
+        if occurrences is None:
+            return None
+
+        title = self.get_title(exc, value)
+        with self._lock:
+            if occurrences.title is None:
+                occurrences.title = title
+
+        return u'{}  [seen {} times in the last {:.1f}s, traceback omitted]\n'.format(title, count, elapsed)
+
+    def _flush(self, now, pending=False):
+        totals = []
+        for fingerprint, occurrences in list(self._occurrences.items()):
+            if pending or now - occurrences.start >= self.window:
+                del self._occurrences[fingerprint]
+                if occurrences.count > 1:
+                    totals.append((occurrences.title, occurrences.count))
+
+        self._next_flush = now + self.window
+        return totals
+
+    def flush(self, pending=False):
+        """Forget the windows which are over, and return the (title, count) of their repeated exceptions.
+
+        With `pending`, the windows which are not over yet are flushed as well,
+        e.g. when exiting.
+        """
+        with self._lock:
+            return self._flush(clock(), pending)
+
+    def report_pending(self):
+        """Flush every window, and report the repeated exceptions to the callback."""
+        totals = self.flush(pending=True)
+        if totals and self.report is not None:
+            self.report(totals)
@@ -0,0 +1,63 @@
+"""Exceptions as plain data, and their encoding as JSON lines.
+
+`structure_exception()` returns the frames, the source lines, the inspected
+values (with the column of their name in the source line) and the message of
+an exception as dicts and lists, without colorizing anything. Log pipelines
+which ingest JSON can use them as is, instead of parsing the text rendering.
+"""
+
+from __future__ import absolute_import
+
+import json
+import logging
+
+
+def dumps(data):
+    """Encode data as compact JSON, on a single line."""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, sort_keys=True, default=repr)
+
+
+def encode_lines(items):
+    """Encode each item as a JSON line, e.g. to be written to a file or a socket."""
+    return u''.join(dumps(item) + u'\n' for item in items)
+
+
+class JSONFormatter(logging.Formatter):
+    """A logging formatter which outputs each record as one line of JSON.
+
+    The exception of a record is structured as by `structure_exception()`.
+    When it was already formatted as text (e.g. from a snapshot, by the
+    background thread of `patch_logging_background()`), the text is output
+    under "traceback" instead.
+    """
+
+    FIELDS = (
+        ('time', 'created'),
+        ('level', 'levelname'),
+        ('logger', 'name'),
+    )
+
+    def __init__(self, fields=FIELDS):
+        """`fields` are the (key, attribute) pairs of the record to output, besides the message."""
+        super(JSONFormatter, self).__init__()
+        self.fields = fields
+
+    def format(self, record):
+        data = dict((key, getattr(record, attribute, None)) for key, attribute in self.fields)
+        data['message'] = record.getMessage()
+
+        if record.exc_info and record.exc_info[0] is not None:
+            data['exception'] = self.structure_exception(*record.exc_info)
+        elif record.exc_text:
+            data['traceback'] = record.exc_text
+
+        # Python 3 only
+        stack_info = getattr(record, 'stack_info', None)
+        if stack_info:
+            data['stack'] = self.formatStack(stack_info)
+
+        return dumps(data)
+
+    def structure_exception(self, exc, value, tb):
+        from . import structure_exception
+        return structure_exception(exc, value, tb)
@@ -0,0 +1,103 @@
+"""Lazy variant of `better_exceptions.hook()'.
+
+Installing the real hook imports the whole library (and with it `logging',
+`ast', `inspect', ...) in every interpreter, which slows down the startup
+of short-lived programs. The `hook()' below only installs small stubs; the
+library is imported the first time an exception actually has to be
+rendered.
+
+This module is deliberately kept out of the `better_exceptions' package so
+that importing it does not run the package's `__init__'.
+"""
+
+import sys
+
+
+_better_exceptions = None
+
+
+def _load():
+    global _better_exceptions
+
+    if _better_exceptions is None:
+        import better_exceptions
+        better_exceptions.hook()
+        _better_exceptions = better_exceptions
+
+    return _better_exceptions
+
+
+def excepthook(exc, value, tb):
+    _load().excepthook(exc, value, tb)
+
+
+def _patch_logging(logging):
+    handle = logging.Logger.__dict__['handle']
+
+    def lazy_handle(self, record):
+        if record.exc_info:
+            # restore the original method first, `hook()' takes care of the rest
+            logging.Logger.handle = handle
+            _load()
+        return handle(self, record)
+
+    logging.Logger.handle = lazy_handle
+
+
+class _PatchingLoader(object):
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        _patch_logging(module)
+
+
+class _LoggingFinder(object):
+    """Patch `logging' as soon as it is imported by someone else."""
+
+    def _remove(self):
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname != 'logging':
+            return None
+
+        self._remove()
+
+        from importlib.util import find_spec
+        spec = find_spec(fullname)
+        if spec is not None and spec.loader is not None:
+            spec.loader = _PatchingLoader(spec.loader)
+        return spec
+
+    def find_module(self, fullname, path=None):
+        # Python 2 import protocol
+        if fullname == 'logging':
+            return self
+        return None
+
+    def load_module(self, fullname):
+        self._remove()
+        module = __import__(fullname)
+        _patch_logging(module)
+        return module
+
+
+def hook():
+    sys.excepthook = excepthook
+
+    if 'logging' in sys.modules:
+        _patch_logging(sys.modules['logging'])
+    else:
+        sys.meta_path.insert(0, _LoggingFinder())
@@ -54,6 +54,7 @@ with open('better_exceptions/__init__.py', 'r') as file:
 setup(
     name = 'better_exceptions',
     packages = ['better_exceptions'],
+    py_modules = ['better_exceptions_lazy'],
     version = version,
     description = 'Pretty and helpful exceptions, automatically',
     author = 'Josh Junon',
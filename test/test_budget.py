@@ -0,0 +1,89 @@
+import better_exceptions
+import sys
+
+better_exceptions.hook()
+
+
+class Counted(object):
+    rendered = 0
+
+    def __init__(self, depth):
+        self.depth = depth
+
+    def __repr__(self):
+        Counted.rendered += 1
+        return '<Counted {}>'.format(self.depth)
+
+
+def descend(depth):
+    value = Counted(depth)
+    if depth == 0:
+        return value.missing
+    return descend(depth - 1)
+
+
+# without collapsing the recursion, the 31 frames of descend() exceed the budget
+better_exceptions.configure(repeat_threshold=None, output_budget=4096, keep_frames=2)
+
+try:
+    descend(30)
+except AttributeError:
+    better_exceptions.excepthook(*sys.exc_info())
+
+# the elided frames were not inspected
+print('rendered: {}'.format(Counted.rendered))
+
+try:
+    descend(30)
+except AttributeError:
+    frames = better_exceptions.structure_exception()['frames']
+    print('structured: {}'.format([frame['elided'] for frame in frames if 'elided' in frame]))
+
+# within the budget, nothing is elided
+better_exceptions.configure(output_budget=1024 * 1024)
+try:
+    descend(3)
+except AttributeError:
+    better_exceptions.excepthook(*sys.exc_info())
+
+better_exceptions.configure(repeat_threshold=3, output_budget=None, keep_frames=5)
+
+
+# the budget holds with values of any length, and a long message
+def overflow(depth, payload):
+    if depth == 0:
+        raise ValueError(payload * 4)
+    return overflow(depth - 1, payload)
+
+
+better_exceptions.configure(repeat_threshold=None, max_length=None, output_budget=4096, keep_frames=2)
+for size in (200, 4000):
+    try:
+        overflow(12, 'x' * size)
+    except ValueError:
+        formatted = better_exceptions.format_exception(*sys.exc_info())
+        print(len(formatted) <= 4096)
+        sys.stdout.flush()
+        better_exceptions.write_stream(u''.join(line[:72] + u'\n' for line in formatted.splitlines()), sys.stdout)
+        record = better_exceptions.capture_exception()
+        print(len(better_exceptions.format_record(record)) <= 4096)
+
+
+
+# the innermost frame is always kept, and the title of a bare assert is its source
+def check(depth, payload):
+    if depth == 0:
+        assert len(payload) < 10
+    return check(depth - 1, payload)
+
+
+better_exceptions.configure(output_budget=2048)
+try:
+    check(12, 'x' * 3000)
+except AssertionError:
+    formatted = better_exceptions.format_exception(*sys.exc_info())
+    print(len(formatted) <= 2048)
+    sys.stdout.flush()
+    better_exceptions.write_stream(u''.join(line[:72] + u'\n' for line in formatted.splitlines()), sys.stdout)
+
+better_exceptions.configure(repeat_threshold=3, max_length=128, output_budget=None, keep_frames=5)
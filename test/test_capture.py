@@ -0,0 +1,41 @@
+import better_exceptions
+import gc
+import pickle
+import sys
+import weakref
+
+better_exceptions.hook()
+
+
+class Payload(object):
+
+    def __repr__(self):
+        return '<Payload>'
+
+
+refs = []
+
+
+def process(payload, factor):
+    refs.append(weakref.ref(payload))
+    return payload.size * factor
+
+
+def capture():
+    try:
+        process(Payload(), 3)
+    except AttributeError:
+        return better_exceptions.capture_exception(), better_exceptions.format_exception(*sys.exc_info())
+
+
+record, formatted = capture()
+gc.collect()
+
+print('payload freed: {}'.format(refs[0]() is None))
+print('frames: {}'.format([(frame.function, frame.lineno) for frame in record.frames]))
+print('same rendering: {}'.format(better_exceptions.format_record(record) == formatted))
+
+copy = pickle.loads(pickle.dumps(record, 0))
+print('pickled: {}'.format(copy == record))
+
+better_exceptions.write_stream(better_exceptions.format_record(copy))
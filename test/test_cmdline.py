@@ -0,0 +1,38 @@
+import better_exceptions
+import subprocess
+import sys
+
+from better_exceptions import formatter
+
+better_exceptions.hook()
+
+source = 'import better_exceptions\nbetter_exceptions.hook()\n\ndef check(a):\n    assert a > 10\n\ncheck(5)\n'
+
+shared = better_exceptions.get_formatter()
+for args in (['python', '-c', 'a = 0\nb = 0'],
+             ['python', '-Bc', 'a = 1'],
+             ['python', '-B', '-c', 'a = 2'],
+             ['python', '-W', 'ignore', '-c', 'a = 3'],
+             ['python', '-Wignore', '-c', 'a = 4'],
+             ['python', '-X', 'dev', '-Ec', 'a = 5'],
+             ['python', '-m', 'module', '-c', 'a = 6'],
+             ['python', 'script.py', '-c', 'a = 7'],
+             ['python', '--', '-c', 'a = 8']):
+    print('{!r}: {!r}'.format(args[1:-1], shared.get_cmdline_source(args)))
+
+# a multi-line source, after options taking a value
+for options in (['-W', 'ignore', '-c'], ['-Bc']):
+    process = subprocess.Popen([sys.executable] + options + [source], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output, _ = process.communicate()
+    sys.stdout.flush()
+    better_exceptions.write_stream(output.decode('utf-8').strip() + u'\n', sys.stdout)
+
+# the arguments of a script are known: `ps' is not needed to find that there is no `-c' source
+spawned = []
+formatter.ExceptionFormatter.get_ps_source = lambda self: spawned.append(True) or ''
+formatter._string_source_lines = None
+try:
+    exec(compile('a = 5\nassert a > 10\n', '<string>', 'exec'))
+except AssertionError:
+    better_exceptions.format_exception(*sys.exc_info())
+print('ps spawned: {}'.format(bool(spawned)))
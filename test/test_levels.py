@@ -0,0 +1,55 @@
+import better_exceptions
+import os
+import subprocess
+import sys
+
+better_exceptions.hook()
+
+
+def divide(numerator, denominator):
+    return numerator // denominator
+
+
+def average(values):
+    return divide(sum(values), len(values))
+
+
+def fail():
+    try:
+        average([])
+    except ZeroDivisionError:
+        return better_exceptions.format_exception(*sys.exc_info())
+
+
+def output(text):
+    # encoded for the output, which is not necessarily unicode-capable in Python 2
+    sys.stdout.flush()
+    better_exceptions.write_stream(text, sys.stdout)
+
+
+for level in (better_exceptions.INNERMOST, better_exceptions.UNCOLORED, better_exceptions.FULL):
+    better_exceptions.configure(level=level)
+    print('level {}:'.format(level))
+    output(fail())
+
+# the frames of the application are not folded, even if they are not inspected
+better_exceptions.configure(level=better_exceptions.INNERMOST, fold_frames=2)
+print('folded:')
+output(fail())
+better_exceptions.configure(level=better_exceptions.FULL, fold_frames=None)
+
+# the output of the tests is piped, not a terminal
+better_exceptions.configure(non_tty_level=better_exceptions.INNERMOST)
+print('not a tty: {}'.format(better_exceptions.get_level()))
+better_exceptions.configure(non_tty_level=None)
+
+better_exceptions.configure(load_threshold=2, load_level=better_exceptions.UNCOLORED)
+levels = []
+for _ in range(4):
+    fail()
+    levels.append(better_exceptions.get_level())
+print('under load: {}'.format(levels))
+
+environment = dict(os.environ, BETTER_EXCEPTIONS_LEVEL='2')
+child = 'import better_exceptions; print(better_exceptions.LEVEL)'
+print('from the environment: {}'.format(subprocess.check_output([sys.executable, '-c', child], env=environment).decode().strip()))
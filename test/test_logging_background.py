@@ -0,0 +1,34 @@
+import better_exceptions
+import logging
+
+logging.basicConfig()
+better_exceptions.hook()
+background = better_exceptions.patch_logging_background(queue_size=10)
+
+logger = logging.getLogger(__name__)
+
+
+def handle(request):
+    items = request['items']
+    try:
+        return sum(items) / len(items)
+    except ZeroDivisionError:
+        logger.exception('could not handle %r', request)
+        # not part of the traceback, which was captured when logging
+        items.append(-1)
+
+
+handle({'items': []})
+logger.warning('after the exception')
+background.flush()
+
+# with two handlers, an exception logged once is not counted twice as a storm
+better_exceptions.configure(storm_window=60)
+handler = logging.StreamHandler()
+handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+logger.addHandler(handler)
+try:
+    {}['k']
+except KeyError:
+    logger.exception('lookup failed')
+background.flush()
@@ -0,0 +1,32 @@
+import better_exceptions
+import logging
+import sys
+
+better_exceptions.hook()
+
+# loggers and handlers created after the hook, the formatter set last
+loggers = [logging.getLogger('app.module{}'.format(i)) for i in range(1000)]
+
+handler = logging.StreamHandler(sys.stderr)
+logging.getLogger().addHandler(handler)
+handler.setFormatter(logging.Formatter('%(name)s: %(message)s'))
+
+plain = logging.StreamHandler(sys.stdout)
+plain.setFormatter(logging.Formatter('stdout %(name)s: %(message)s'))
+logging.getLogger('app.module7').addHandler(plain)
+logging.getLogger('app.module7').propagate = False
+
+
+def lookup(mapping, key):
+    try:
+        return mapping[key]
+    except KeyError:
+        loggers[3].exception('lookup failed')
+        loggers[7].error('lookup failed')
+
+
+lookup({}, 'key')
+
+# only the handlers writing to stderr are patched
+print('patched: {}, {}'.format('formatException' in handler.formatter.__dict__,
+                               'formatException' in plain.formatter.__dict__))
@@ -0,0 +1,46 @@
+import better_exceptions
+import logging
+import sys
+
+from better_exceptions import FormatStats
+
+stats = FormatStats()
+better_exceptions.configure(stats=stats)
+
+logger = logging.getLogger('memo')
+logger.propagate = False
+for name in ('console', 'file', 'syslog'):
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(name + ': %(message)s'))
+    logger.addHandler(handler)
+
+better_exceptions.hook()
+# patch the handlers writing to stdout as well, so that the output is ordered
+for handler in logger.handlers:
+    handler.formatter.formatException = lambda exc_info: better_exceptions.format_exception(*exc_info)
+
+
+def fetch(key):
+    cache = {}
+    return cache[key]
+
+
+try:
+    fetch('user:1')
+except KeyError:
+    logger.exception('fetch failed')
+    logger.exception('fetch failed again')
+
+print('formatted: {}'.format(stats.snapshot()['exceptions']))
+
+try:
+    fetch('user:2')
+except KeyError:
+    error = sys.exc_info()
+
+colored = better_exceptions.SUPPORTS_COLOR
+for supports_color in (colored, not colored, colored, not colored):
+    better_exceptions.configure(supports_color=supports_color)
+    logger.error('fetch failed', exc_info=error)
+
+print('formatted: {}'.format(stats.snapshot()['exceptions']))
@@ -0,0 +1,11 @@
+import better_exceptions
+better_exceptions.hook()
+
+
+def check(value, limit):
+    if (value < limit or
+            value % limit == 0):
+        return value
+
+
+check(10, 0)
@@ -0,0 +1,58 @@
+import better_exceptions
+import os
+import shutil
+import sys
+import tempfile
+
+from better_exceptions import FramePolicy
+
+better_exceptions.hook()
+
+# a fake installed package, calling back into the application
+directory = tempfile.mkdtemp()
+with open(os.path.join(directory, 'framework.py'), 'w') as f:
+    f.write(
+        'def dispatch(handler, request):\n'
+        '    return middleware(handler, request)\n'
+        '\n'
+        'def middleware(handler, request):\n'
+        '    response = handler(request)\n'
+        '    return response\n'
+    )
+sys.path.insert(0, directory)
+
+import framework  # noqa: E402
+
+
+def view(request):
+    return framework.dispatch(handler, request)
+
+
+def handler(request):
+    return request['user']
+
+
+policies = (FramePolicy('inspect', module='test_*'), FramePolicy('plain', path=directory))
+
+for fold_frames in (None, 2):
+    better_exceptions.configure(frame_policies=policies, fold_frames=fold_frames)
+    try:
+        view({})
+    except KeyError:
+        better_exceptions.excepthook(*sys.exc_info())
+
+try:
+    view({})
+except KeyError:
+    # the policies were decided once per code object
+    formatter = better_exceptions.get_formatter()
+    formatter.format_exception(*sys.exc_info())
+    print('policies: {}'.format(sorted(formatter._frame_policies._cache.stats().items())))
+    print('structured: {}'.format(better_exceptions.structure_exception()['frames'][2]))
+
+try:
+    FramePolicy('hide', path=directory)
+except ValueError as e:
+    print(e)
+
+shutil.rmtree(directory)
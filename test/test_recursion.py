@@ -0,0 +1,21 @@
+import better_exceptions
+better_exceptions.hook()
+
+
+def countdown(n):
+    if n == 0:
+        return ping(20)
+    return countdown(n - 1)
+
+
+def ping(n):
+    return pong(n)
+
+
+def pong(n):
+    if n == 0:
+        raise ValueError('bottom reached')
+    return ping(n - 1)
+
+
+countdown(50)
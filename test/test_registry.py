@@ -0,0 +1,46 @@
+import better_exceptions
+import sys
+import types
+
+better_exceptions.hook()
+
+
+class Expensive(object):
+    renders = 0
+
+    def __repr__(self):
+        Expensive.renders += 1
+        return '<Expensive>'
+
+
+class Cheaper(Expensive):
+    pass
+
+
+def check(value, other):
+    return value is other and value.missing
+
+
+def run(value):
+    return check(value, value) or sys.maxsize
+
+
+try:
+    run(Expensive())
+except AttributeError:
+    better_exceptions.excepthook(*sys.exc_info())
+
+# the value appears 4 times over two frames, it is rendered once
+print('renders: {}'.format(Expensive.renders))
+
+better_exceptions.register_repr(types.FunctionType, better_exceptions.SKIP)
+better_exceptions.register_repr(types.ModuleType, better_exceptions.SKIP)
+better_exceptions.register_repr(type, better_exceptions.SKIP)
+better_exceptions.register_repr(Expensive, lambda value: '<{} not rendered>'.format(type(value).__name__))
+
+try:
+    run([Cheaper(), sys])
+except AttributeError:
+    better_exceptions.excepthook(*sys.exc_info())
+
+print('renders: {}'.format(Expensive.renders))
@@ -0,0 +1,38 @@
+import better_exceptions
+import sys
+
+from better_exceptions import repl
+
+better_exceptions.hook()
+
+
+entry = repl.ReplEntry(None, '<console>', 'def foo(a):\r\n    return a + 1\n\nfoo(1)')
+print('lines: {}'.format([entry.line(lineno) for lineno in range(0, 6)]))
+
+code = compile('x = 1', '<console>', 'exec')
+entries = repl.ReplEntries(memory_limit=None)
+for i in range(3):
+    entries.add(i, code, '<console>', 'x = {}'.format(i))
+per_entry = entries.size // 3
+
+# room for 3 sources, but only for the code of one of the commands
+entries = repl.ReplEntries(memory_limit=per_entry + 2 * entries[0].source_size)
+for i in range(3):
+    entries.add(i, code, '<console>', 'x = {}'.format(i))
+print('kept: {}, with code: {}, evictions: {}'.format(
+    len(entries), [i for i in range(3) if entries[i].code is not None], entries.evictions))
+
+# without any room for the code, the least recently used sources are dropped
+entries.memory_limit = 2 * entries[0].source_size
+entries[0]
+entries.add(3, code, '<console>', 'x = 3')
+print('kept: {}, evictions: {}'.format([i for i in range(4) if i in entries], entries.evictions))
+
+console = repl.BetterExceptionsConsole(memory_limit=None)
+repl.repl = console
+sys.stderr = sys.stdout
+
+console.push('def divide(a, b):')
+console.push('    return a / b')
+console.push('')
+console.push('divide(1, 0)')
@@ -0,0 +1,50 @@
+import better_exceptions
+import os
+import shutil
+import sys
+import tempfile
+
+from better_exceptions.formatter import ExceptionFormatter
+
+better_exceptions.hook()
+sys.dont_write_bytecode = True
+
+directory = tempfile.mkdtemp()
+filename = os.path.join(directory, 'computation.py')
+
+
+def write_module(source, mtime):
+    with open(filename, 'w') as f:
+        f.write('def compute(value):\n    {}\n'.format(source))
+    os.utime(filename, (mtime, mtime))
+
+
+write_module('return value / 0', 1000000000)
+sys.path.insert(0, directory)
+
+import computation  # noqa: E402
+
+formatter = ExceptionFormatter(colored=False)
+
+
+def show():
+    try:
+        computation.compute(1)
+    except ZeroDivisionError:
+        formatted = formatter.format_exception(*sys.exc_info())
+    print(' | '.join(line.strip() for line in formatted.splitlines() if 'value' in line and 'File' not in line))
+    print(sorted(formatter.cache_stats().items()))
+
+
+show()
+show()
+
+# the lines of a file which changed are read and parsed again: with another size...
+write_module('return value // 0', 1000000000)
+show()
+
+# ... or only another modification time
+write_module('return value %  0', 1000000010)
+show()
+
+shutil.rmtree(directory)
@@ -0,0 +1,52 @@
+import better_exceptions
+import linecache
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+
+from better_exceptions import sources
+
+better_exceptions.hook()
+
+directory = tempfile.mkdtemp()
+
+# a generated module, big enough to be mapped rather than read through linecache
+generated_path = os.path.join(directory, 'generated.py')
+with open(generated_path, 'w') as f:
+    f.write('# -*- coding: utf-8 -*-\n')
+    for i in range(20000):
+        f.write('VALUE_{0} = {0}  # padding padding padding padding padding padding\n'.format(i))
+    f.write('def divide(numerator):\n')
+    f.write('    return numerator / VALUE_0\n')
+
+archive = os.path.join(directory, 'archive.zip')
+with zipfile.ZipFile(archive, 'w') as zf:
+    zf.writestr('zipped/__init__.py', '')
+    zf.writestr('zipped/module.py', 'def lookup(mapping, key):\r\n    return mapping[key]\r\n')
+
+sys.path.insert(0, directory)
+sys.path.insert(0, archive)
+
+import generated  # noqa: E402
+from zipped import module  # noqa: E402
+
+mapped = sources.MappedFile(generated_path, None)
+print('lines: {!r} {!r} {!r}'.format(mapped.line(2)[:9], mapped.line(20003), mapped.line(20004)))
+print('indexed: {}'.format(len(mapped.offsets)))
+print('whole source: {!r}'.format(sources.MmapSourceProvider().get_source(generated_path)))
+
+try:
+    generated.divide(1)
+except ZeroDivisionError:
+    better_exceptions.excepthook(*sys.exc_info())
+
+print('in linecache: {}'.format(generated_path in linecache.cache))
+
+try:
+    module.lookup({}, 'missing')
+except KeyError:
+    better_exceptions.excepthook(*sys.exc_info())
+
+shutil.rmtree(directory)
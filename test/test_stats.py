@@ -0,0 +1,31 @@
+import better_exceptions
+import sys
+
+from better_exceptions import FormatStats
+
+better_exceptions.hook()
+
+reports = []
+stats = FormatStats(callback=reports.append)
+better_exceptions.configure(stats=stats)
+
+
+def divide(a, b):
+    return a / b
+
+
+for _ in range(3):
+    try:
+        divide(1, 0)
+    except ZeroDivisionError:
+        better_exceptions.format_exception(*sys.exc_info())
+
+snapshot = stats.snapshot()
+print('exceptions: {exceptions}, frames: {frames}'.format(**snapshot))
+for phase, counters in sorted(snapshot['phases'].items()):
+    print('{}: {}'.format(phase, counters['count']))
+
+print('report: {} with {} frames'.format(reports[0]['exception'], reports[0]['frames']))
+print('slowest types: {}'.format(sorted(key for key, _, _ in stats.slowest(stats.by_type))))
+
+divide(1, 0)
@@ -0,0 +1,46 @@
+import better_exceptions
+import re
+import sys
+
+better_exceptions.hook()
+better_exceptions.configure(storm_window=60)
+
+
+def output(text):
+    # encoded for the output, which is not necessarily unicode-capable in Python 2
+    sys.stdout.flush()
+    better_exceptions.write_stream(text + u'\n', sys.stdout)
+
+
+def connect(host):
+    raise IOError('connection refused: {}'.format(host))
+
+
+for i in range(4):
+    try:
+        connect('db{}'.format(i % 2))
+    except IOError:
+        formatted = better_exceptions.format_exception(*sys.exc_info())
+        output(re.sub(r'in the last [0-9.]+s', 'in the last <elapsed>', formatted))
+
+guard = better_exceptions.get_storm_guard()
+print(guard.flush())
+guard.window = 0
+print(guard.flush())
+
+# a built-in exception formatted twice, with different settings, is not a repetition of itself
+try:
+    {}['missing']
+except KeyError:
+    for max_length in (None, 64):
+        better_exceptions.configure(max_length=max_length)
+        output(better_exceptions.format_exception(*sys.exc_info()))
+
+# the storms still pending are reported when exiting
+better_exceptions.configure(max_length=128, storm_report=lambda totals: output('reported: {}'.format(totals)))
+for _ in range(3):
+    try:
+        connect('db2')
+    except IOError:
+        better_exceptions.format_exception(*sys.exc_info())
+output('exiting')
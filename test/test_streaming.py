@@ -0,0 +1,65 @@
+import better_exceptions
+import io
+import sys
+
+from better_exceptions.context import PY3
+
+better_exceptions.hook()
+
+
+class Capture(object):
+    """Receive what the excepthook writes, chunk by chunk."""
+
+    def __init__(self):
+        # the encoded output is written to the buffer of the stream in Python 3
+        self.buffer = self
+        self.data = io.BytesIO()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        self.data.write(data)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return self.data.getvalue()
+
+
+def divide(numerator, denominator):
+    return numerator / denominator
+
+
+def fail():
+    try:
+        divide(1, 0)
+    except ZeroDivisionError:
+        return sys.exc_info()
+
+
+def hook(streaming, exc_info):
+    better_exceptions.configure(streaming=streaming)
+    capture = better_exceptions.STREAM = Capture()
+    better_exceptions.excepthook(*exc_info)
+    return capture
+
+
+first, second = fail(), fail()
+streamed = hook(True, first)
+buffered = hook(False, second)
+print('streamed in several writes: {}, buffered in {}'.format(streamed.writes > 1, buffered.writes))
+print('same output: {}'.format(streamed.getvalue() == buffered.getvalue()))
+
+# the exceptions already formatted are written at once, the streamed ones are not kept
+for streaming, exc_info in ((True, second), (False, second), (True, first)):
+    again = hook(streaming, exc_info)
+    print('memoized: {}, same output: {}'.format(again.writes == 1, again.getvalue() == buffered.getvalue()))
+
+sys.stdout.flush()
+if PY3:
+    sys.stdout.buffer.write(streamed.getvalue())
+else:
+    sys.stdout.write(streamed.getvalue())
@@ -0,0 +1,57 @@
+import better_exceptions
+import json
+import logging
+import os
+from better_exceptions.structured import JSONFormatter, dumps
+
+better_exceptions.hook()
+
+
+def strip_paths(structured):
+    for frame in structured['frames']:
+        if 'filename' in frame:
+            frame['filename'] = os.path.basename(frame['filename'])
+    return structured
+
+
+def divide(numerator, denominator):
+    return numerator // denominator
+
+
+def compute(values):
+    total = sum(values)
+    return divide(total, len(values) - 3)
+
+
+try:
+    compute([1, 2, 3])
+except ZeroDivisionError:
+    structured = strip_paths(better_exceptions.structure_exception())
+
+print(dumps(structured))
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+handler = ListHandler()
+handler.setFormatter(JSONFormatter(fields=(('level', 'levelname'), ('logger', 'name'))))
+logger = logging.getLogger('test_structured')
+logger.propagate = False
+logger.addHandler(handler)
+
+try:
+    compute([4, 5, 6])
+except ZeroDivisionError:
+    logger.exception('computing failed')
+
+line = json.loads(handler.lines[0])
+strip_paths(line['exception'])
+print(dumps(line))
@@ -0,0 +1,54 @@
+from __future__ import print_function
+import io
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+
+from better_exceptions import color
+
+
+def compile_terminfo(magic, max_colors):
+    number_format = color.TERMINFO_MAGIC[magic]
+    names = b'fake|a fake terminal\0'
+    bools = b'\1\0\1'
+    numbers = [80, -1, 24] + [-1] * 10 + [max_colors, 64]
+    header = struct.pack('<6h', magic, len(names), len(bools), len(numbers), 0, 0)
+    padding = b'\0' * ((len(header) + len(names) + len(bools)) % 2)
+    return header + names + bools + padding + b''.join(struct.pack(number_format, n) for n in numbers)
+
+
+# 16777216 colors (direct color) only fit in the extended format
+for magic, max_colors in [(0x11A, 8), (0x11A, 256), (0x11A, -1), (0x21E, 8), (0x21E, 16777216), (0x21E, -1)]:
+    f = io.BytesIO(compile_terminfo(magic, max_colors))
+    print('extended' if magic == 0x21E else 'legacy', max_colors, color.read_max_colors(f))
+
+print('truncated', color.read_max_colors(io.BytesIO(compile_terminfo(0x21E, 256)[:20])))
+print('invalid', color.read_max_colors(io.BytesIO(b'\x1a\x03' + compile_terminfo(0x11A, 8)[2:])))
+
+directory = tempfile.mkdtemp()
+os.makedirs(os.path.join(directory, 'f'))
+with open(os.path.join(directory, 'f', 'fake-256color'), 'wb') as f:
+    f.write(compile_terminfo(0x21E, 256))
+
+original_dirs = color.get_terminfo_dirs
+color.get_terminfo_dirs = lambda: [directory]
+os.environ['TERM'] = 'fake-256color'
+os.environ.pop(color.COLORS_VARIABLE, None)
+
+print('detected', color.get_max_colors())
+color.share_detection()
+
+# the child process reuses the detection of its parent, the terminfo file is not read again
+os.remove(os.path.join(directory, 'f', 'fake-256color'))
+child = (
+    'from better_exceptions import color\n'
+    'color.get_terminfo_dirs = lambda: [{!r}]\n'
+    'print(color.get_max_colors())\n'
+).format(directory)
+print('child', subprocess.check_output([sys.executable, '-c', child]).decode().strip())
+
+color.get_terminfo_dirs = original_dirs
+shutil.rmtree(directory)
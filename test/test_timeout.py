@@ -0,0 +1,76 @@
+import better_exceptions
+import sys
+import time
+
+better_exceptions.hook()
+
+
+class Slow(object):
+
+    def __repr__(self):
+        end = time.time() + 10
+        while time.time() < end:
+            pass
+        return '<Slow>'
+
+
+def query(slow):
+    return slow.missing
+
+
+def handle(slow):
+    return query(slow)
+
+
+def show():
+    try:
+        handle(Slow())
+    except AttributeError:
+        sys.stdout.flush()
+        better_exceptions.write_stream(better_exceptions.format_exception(*sys.exc_info()), sys.stdout)
+
+
+# each value has its own limit
+better_exceptions.configure(repr_timeout=0.05)
+show()
+
+# the values of the whole traceback share one, the frames after it are not inspected
+better_exceptions.configure(repr_timeout=None, format_timeout=0.05)
+show()
+
+# a value which catches the timeout is interrupted anyway
+class Careless(Slow):
+
+    def __repr__(self):
+        try:
+            return Slow.__repr__(self)
+        except Exception:
+            return Slow.__repr__(self)
+
+
+better_exceptions.configure(repr_timeout=0.05, format_timeout=None)
+start = time.time()
+try:
+    handle(Careless())
+except AttributeError:
+    formatted = better_exceptions.format_exception(*sys.exc_info())
+print('timed out: {}, interrupted: {}'.format('<repr timed out>' in formatted, time.time() - start < 5))
+
+# a tracer already installed keeps receiving the events while the values are rendered
+traced = set()
+
+
+def previous(frame, event, arg):
+    traced.add(frame.f_code.co_name)
+    return previous
+
+
+sys.settrace(previous)
+better_exceptions.configure(repr_timeout=0.05, format_timeout=None)
+try:
+    handle(Slow())
+except AttributeError:
+    better_exceptions.format_exception(*sys.exc_info())
+restored = sys.gettrace() is previous
+sys.settrace(None)
+print('traced: {}, restored: {}'.format('__repr__' in traced, restored))
@@ -0,0 +1,12 @@
+import better_exceptions
+better_exceptions.hook()
+better_exceptions.MAX_LENGTH = 20
+
+
+def fill():
+    data = {'key': [b'x' * 100000] * 1000}
+    nested = [data, (data,), set(range(1000))]
+    return data, nested[5]
+
+
+fill()
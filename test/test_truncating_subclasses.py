@@ -0,0 +1,94 @@
+import better_exceptions
+from collections import Counter, OrderedDict, defaultdict, deque
+
+from better_exceptions.repr import BoundedRepr
+
+better_exceptions.hook()
+
+
+class Rendered(object):
+    count = 0
+
+    def __repr__(self):
+        Rendered.count += 1
+        return '<Rendered>'
+
+
+class Items(list):
+    pass
+
+
+class Mapping(dict):
+    pass
+
+
+class Labels(set):
+    pass
+
+
+class Custom(list):
+
+    def __repr__(self):
+        return 'Custom({})'.format(len(self))
+
+
+# repr() does not read these through the methods they override...
+class Transformed(dict):
+
+    def __getitem__(self, key):
+        return 'transformed'
+
+
+class Changed(list):
+
+    def __iter__(self):
+        return iter(['changed'])
+
+
+class Quoted(str):
+
+    def __getitem__(self, index):
+        return 'changed'
+
+
+# ...but it does for these
+class Iterated(set):
+
+    def __iter__(self):
+        return iter(['changed'])
+
+
+class Ordered(OrderedDict):
+
+    def __getitem__(self, key):
+        return 'transformed'
+
+
+recursive = deque([1])
+recursive.append(recursive)
+
+values = [
+    OrderedDict([('a', 1), ('b', [2, 3])]), OrderedDict(),
+    defaultdict(list, {'a': [1]}), defaultdict(None),
+    Counter('abracadabra'), Counter(),
+    deque([1, 2]), deque([1], maxlen=3), deque(), recursive,
+    Items([1, 2]), Mapping(a=1), Labels([1]), Labels(), Custom([1, 2]),
+    Transformed(a=1), Changed([1, 2]), Quoted("it's"), Iterated([1]), Ordered(a=1),
+]
+
+unbounded = BoundedRepr(None)
+print('same as repr: {}'.format([unbounded.repr(value) == repr(value) for value in values]))
+
+bounded = BoundedRepr(20)
+for value in values:
+    print(bounded.repr(value))
+
+# only the beginning of large containers is rendered
+for cls in (Items, deque):
+    Rendered.count = 0
+    bounded.repr(cls(Rendered() for _ in range(10000)))
+    print('{}: {} rendered'.format(cls.__name__, Rendered.count))
+
+Rendered.count = 0
+bounded.repr(OrderedDict((i, Rendered()) for i in range(10000)))
+print('OrderedDict: {} rendered'.format(Rendered.count))
@@ -34,15 +34,37 @@ function test_case {
 function test_all {
 	test_case "$BETEXC_PYTHON" "test/test.py"
 	test_case "$BETEXC_PYTHON" "test/test_color.py"
+	test_case "$BETEXC_PYTHON" "test/test_terminfo.py"
 	test_case "$BETEXC_PYTHON" "test/test_encoding.py"
 	test_case "./test/test_interactive.sh"
 	# test_case "./test/test_interactive_raw.sh"
 	test_case "./test/test_string.sh"
 	test_case "$BETEXC_PYTHON" "test/test_logging.py"
+	test_case "$BETEXC_PYTHON" "test/test_logging_background.py"
 	test_case "$BETEXC_PYTHON" "test/test_truncating.py"
 	test_case "$BETEXC_PYTHON" "test/test_truncating_disabled.py"
+	test_case "$BETEXC_PYTHON" "test/test_truncating_containers.py"
 	test_case "$BETEXC_PYTHON" "test/test_indentation_error.py"
 	test_case "$BETEXC_PYTHON" "test/test_syntax_error.py"
+	test_case "$BETEXC_PYTHON" "test/test_recursion.py"
+	test_case "$BETEXC_PYTHON" "test/test_multiline.py"
+	test_case "$BETEXC_PYTHON" "test/test_stats.py"
+	test_case "$BETEXC_PYTHON" "test/test_storm.py"
+	test_case "$BETEXC_PYTHON" "test/test_memo.py"
+	test_case "$BETEXC_PYTHON" "test/test_capture.py"
+	test_case "$BETEXC_PYTHON" "test/test_structured.py"
+	test_case "$BETEXC_PYTHON" "test/test_repl_entries.py"
+	test_case "$BETEXC_PYTHON" "test/test_sources.py"
+	test_case "$BETEXC_PYTHON" "test/test_policies.py"
+	test_case "$BETEXC_PYTHON" "test/test_registry.py"
+	test_case "$BETEXC_PYTHON" "test/test_levels.py"
+	test_case "$BETEXC_PYTHON" "test/test_logging_handlers.py"
+	test_case "$BETEXC_PYTHON" "test/test_budget.py"
+	test_case "$BETEXC_PYTHON" "test/test_cmdline.py"
+	test_case "$BETEXC_PYTHON" "test/test_truncating_subclasses.py"
+	test_case "$BETEXC_PYTHON" "test/test_timeout.py"
+	test_case "$BETEXC_PYTHON" "test/test_streaming.py"
+	test_case "$BETEXC_PYTHON" "test/test_source_cache.py"
 }
 
 for encoding in ascii "UTF-8"; do